@@ -0,0 +1,45 @@
+"""
+历史行情统计内核
+
+numba 可用时以 nopython 模式编译（cache=True 落盘，跨进程复用编译结果），
+否则回退为 numpy 实现。内核只返回数值，格式化留在 Python 层完成。
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba 为可选依赖
+    NUMBA_AVAILABLE = False
+
+
+def _history_stats_numpy(px: np.ndarray):
+    """numpy 版本：(起始价, 最新价, 最低价, 最高价, 累计涨跌%)"""
+    start = px[0]
+    end = px[-1]
+    return start, end, np.nanmin(px), np.nanmax(px), (end - start) / start * 100.0
+
+
+if NUMBA_AVAILABLE:
+    # 不开 fastmath：需要保留 NaN 判断；error_model='numpy' 使除零得到 inf 而非异常
+    @njit(cache=True, error_model='numpy')
+    def history_stats(px):
+        """单次遍历计算 (起始价, 最新价, 最低价, 最高价, 累计涨跌%)，求极值时跳过 NaN"""
+        mn = np.inf
+        mx = -np.inf
+        for i in range(px.shape[0]):
+            v = px[i]
+            if v != v:
+                continue
+            if v < mn:
+                mn = v
+            if v > mx:
+                mx = v
+        start = px[0]
+        end = px[px.shape[0] - 1]
+        return start, end, mn, mx, (end - start) / start * 100.0
+
+    # 导入时预热编译，避免首次分析时的 JIT 延迟
+    history_stats(np.ones(2, dtype=np.float64))
+else:
+    history_stats = _history_stats_numpy
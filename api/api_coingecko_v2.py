@@ -3,12 +3,61 @@
 支持前N名币种价格实时获取，多货币显示，错误处理完善
 """
 import time
+import random
+import bisect
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Optional, Tuple
 import sys
 import json
+import threading
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from collections import ChainMap
+from types import MappingProxyType
 from datetime import datetime
 
+try:
+    import orjson
+    _json_loads = orjson.loads  # orjson.JSONDecodeError 继承自 json.JSONDecodeError
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    _json_loads = json.loads
+
+# 货币符号映射
+CURRENCY_SYMBOLS = MappingProxyType({
+    'usd': '$',
+    'eur': '€',
+    'gbp': '£',
+    'jpy': '¥',
+    'cny': 'CN¥',  # 使用CN¥区分日元和人民币
+    'krw': '₩',
+    'aud': 'A$',
+    'cad': 'C$',
+    'inr': '₹',
+    'rub': '₽',
+    'chf': 'CHF',
+    'sgd': 'S$',
+    'hkd': 'HK$'
+})
+
+# 预定义格式串，避免每次调用重新解析格式说明
+PCT_FMT = "{} {:+.2f}%"
+ROW_FMT = "{:<4} {:<18} {:<8} {:<18} {:<12} {:<12} {:<12} {:<12}"
+
+
+class JitteredRetry(Retry):
+    """带随机抖动和上限的退避策略，避免固定 1s/2s/4s 等待和集中重试"""
+
+    BACKOFF_CAP = 8.0
+
+    def get_backoff_time(self) -> float:
+        attempts = len(self.history)
+        if attempts == 0:
+            return 0
+        return min(self.BACKOFF_CAP, random.uniform(0.2, 0.5) * (2 ** attempts))
+
 
 class CryptoPriceMonitor:
     """加密货币价格监控器"""
@@ -19,8 +68,43 @@ class CryptoPriceMonitor:
     DEFAULT_TIMEOUT = 10
     DEFAULT_RETRY_COUNT = 3
 
+    # 必需字段
+    _REQUIRED_FIELDS = frozenset({'id', 'symbol', 'name', 'current_price', 'market_cap_rank'})
+
+    # 表格行字段（一次 C 层调用取出整行）
+    _ROW_FIELDS = (
+        'id', 'market_cap_rank', 'name', 'symbol', 'current_price', 'market_cap',
+        'price_change_percentage_1h_in_currency',
+        'price_change_percentage_24h_in_currency',
+        'price_change_percentage_7d_in_currency'
+    )
+    _ROW_KEYS = itemgetter(*_ROW_FIELDS)
+
+    # 涨跌幅分档（0 单独处理为平盘）
+    _PCT_THRESHOLDS = (-5, -2, 0, 2, 5)
+    _PCT_LABELS = (
+        "💥🔴",   # 大跌
+        "⬇️ 🔴",  # 下跌
+        "↘️ 🟠",  # 微跌
+        "↗️ 🟢",  # 微涨
+        "⬆️ 🟢",  # 上涨
+        "🚀🟢",   # 大涨
+    )
+    _PCT_FLAT = "➡️ ⚪"  # 平盘
+
+    # 价格分档：bisect_right(_PRICE_BINS, price) 对应 (格式, 是否去掉末尾0)
+    _PRICE_BINS = (0.0001, 0.01, 1, 1000)
+    _PRICE_FMTS = (
+        ("{}{:.2e}", False),   # 科学计数法显示极小数
+        ("{}{:.6f}", True),    # >= 0.0001
+        ("{}{:.4f}", True),    # >= 0.01
+        ("{}{:,.2f}", False),  # >= 1
+        ("{}{:,.0f}", False),  # >= 1000
+    )
+
     def __init__(self, base_currency: str = 'usd', timeout: int = None,
-                 retry_count: int = None, refresh_interval: int = None):
+                 retry_count: int = None, refresh_interval: int = None,
+                 extra_symbols: Optional[Dict[str, str]] = None):
         """
         初始化监控器
 
@@ -29,8 +113,10 @@ class CryptoPriceMonitor:
             timeout: 请求超时时间(秒)
             retry_count: 重试次数
             refresh_interval: 刷新间隔(秒)
+            extra_symbols: 自定义货币符号(可选)
         """
         self.base_currency = base_currency.lower()
+        self._base_upper = self.base_currency.upper()
         self.timeout = timeout or self.DEFAULT_TIMEOUT
         self.retry_count = retry_count or self.DEFAULT_RETRY_COUNT
         self.refresh_interval = refresh_interval or self.DEFAULT_REFRESH_INTERVAL
@@ -42,22 +128,29 @@ class CryptoPriceMonitor:
             'Accept': 'application/json'
         })
 
-        # 货币符号映射
-        self.currency_symbols = {
-            'usd': '$',
-            'eur': '€',
-            'gbp': '£',
-            'jpy': '¥',
-            'cny': 'CN¥',  # 使用CN¥区分日元和人民币
-            'krw': '₩',
-            'aud': 'A$',
-            'cad': 'C$',
-            'inr': '₹',
-            'rub': '₽',
-            'chf': 'CHF',
-            'sgd': 'S$',
-            'hkd': 'HK$'
-        }
+        # 连接池 + 自动重试（429/5xx 抖动退避，遵循 Retry-After）
+        retry = JitteredRetry(
+            total=self.retry_count,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+
+        # 后台预取线程：网络请求与刷新等待重叠
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._stop_event = threading.Event()
+
+        # 货币符号映射（共享模块常量，可用 extra_symbols 覆盖/补充）
+        self.currency_symbols = (ChainMap(extra_symbols, CURRENCY_SYMBOLS)
+                                 if extra_symbols else CURRENCY_SYMBOLS)
+
+        # 币种代码大写缓存: coin id -> 显示用代码
+        self._symbol_cache: Dict[str, str] = {}
+
+        # 条件请求缓存: (per_page, page) -> (ETag, Last-Modified, 上次校验后的数据)
+        self._conditional_cache: Dict[Tuple[int, int], Tuple[Optional[str], Optional[str], List[Dict]]] = {}
 
     def fetch_top_coins(self, count: int, page: int = 1) -> Optional[List[Dict]]:
         """
@@ -68,7 +161,7 @@ class CryptoPriceMonitor:
             page: 页码
 
         Returns:
-            币种数据列表或None(失败时)
+            币种行数据列表(见 extract_row)或None(失败时)
         """
         url = 'https://api.coingecko.com/api/v3/coins/markets'
         params = {
@@ -80,64 +173,94 @@ class CryptoPriceMonitor:
             'price_change_percentage': '1h,24h,7d,30d'
         }
 
-        for attempt in range(self.retry_count):
-            try:
-                resp = self.session.get(url, params=params, timeout=self.timeout)
-                resp.raise_for_status()
-                data = resp.json()
-
-                if not data:
-                    print("⚠️  未获取到数据，可能是API限制")
-                    return None
-
-                # 验证数据完整性
-                validated_data = [coin for coin in data if self.validate_coin_data(coin)]
-                if len(validated_data) < len(data):
-                    print(f"⚠️  过滤了 {len(data) - len(validated_data)} 个无效数据项")
-
-                return validated_data
-
-            except requests.exceptions.Timeout:
-                print(f"⏰  请求超时，第{attempt + 1}次重试...")
-            except requests.exceptions.ConnectionError:
-                print(f"🌐  网络连接错误，第{attempt + 1}次重试...")
-            except requests.exceptions.HTTPError as e:
-                if hasattr(e, 'response') and e.response.status_code == 429:
-                    wait_time = 60
-                    print(f"🚫  API频率限制，等待{wait_time}秒...")
-                    time.sleep(wait_time)
-                else:
-                    status_code = e.response.status_code if hasattr(e, 'response') else 'Unknown'
-                    print(f"❌  HTTP错误 {status_code}: {e}")
-                    break
-            except json.JSONDecodeError as e:
-                print(f"❌  JSON解析错误: {e}")
-                break
-            except Exception as e:
-                print(f"❌  意外错误: {e}")
-                break
+        # 带上 ETag / Last-Modified，数据未变化时服务端返回 304
+        cache_key = (params['per_page'], page)
+        cached = self._conditional_cache.get(cache_key)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
 
-            if attempt < self.retry_count - 1:
-                time.sleep(2 ** attempt)  # 指数退避策略
+        try:
+            resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            if resp.status_code == 304 and cached:
+                return cached[2]
+
+            resp.raise_for_status()
+            data = _json_loads(resp.content)
+
+            if not data:
+                print("⚠️  未获取到数据，可能是API限制")
+                return None
+
+            # 验证数据完整性并一次性抽取表格行
+            extract_row = self.extract_row
+            rows = [row for coin in data if (row := extract_row(coin)) is not None]
+            if len(rows) < len(data):
+                print(f"⚠️  过滤了 {len(data) - len(rows)} 个无效数据项")
+
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._conditional_cache[cache_key] = (etag, last_modified, rows)
+
+            return rows
+
+        except requests.exceptions.RetryError:
+            print(f"🚫  重试{self.retry_count}次后仍失败(API频率限制或服务异常)")
+        except requests.exceptions.Timeout:
+            print("⏰  请求超时")
+        except requests.exceptions.ConnectionError:
+            print("🌐  网络连接错误")
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else 'Unknown'
+            print(f"❌  HTTP错误 {status_code}: {e}")
+        except json.JSONDecodeError as e:
+            print(f"❌  JSON解析错误: {e}")
+        except Exception as e:
+            print(f"❌  意外错误: {e}")
 
         return None
 
-    def validate_coin_data(self, coin: Dict) -> bool:
+    def extract_row(self, coin: Dict) -> Optional[Tuple]:
         """
-        验证币种数据完整性
+        验证币种数据完整性并抽取表格行
 
         Args:
             coin: 币种数据字典
 
         Returns:
-            数据是否有效
+            (排名, 名称, 代码, 价格, 市值, 1h%, 24h%, 7d%) 或None(数据无效)
         """
-        required_fields = ['id', 'symbol', 'name', 'current_price', 'market_cap_rank']
-        return all(field in coin and coin[field] is not None for field in required_fields)
+        try:
+            cid, rank, name, symbol, price, market_cap, change_1h, change_24h, change_7d = self._ROW_KEYS(coin)
+        except KeyError:  # 必需字段缺失则无效，可选字段缺失按None处理
+            if not self._REQUIRED_FIELDS <= coin.keys():
+                return None
+            cid, rank, name, symbol, price, market_cap, change_1h, change_24h, change_7d = \
+                (coin.get(field) for field in self._ROW_FIELDS)
+
+        if cid is None or rank is None or name is None or symbol is None or price is None:
+            return None
+
+        symbol = self._symbol_cache.get(cid) or self._symbol_cache.setdefault(cid, symbol.upper()[:6])
+        return rank, name[:16], symbol, price, market_cap, change_1h, change_24h, change_7d
+
+    def validate_coin_data(self, coin: Dict) -> bool:
+        """验证币种数据完整性"""
+        return self.extract_row(coin) is not None
+
+    @cached_property
+    def currency_symbol(self) -> str:
+        """当前货币符号（首次访问后缓存在实例上）"""
+        return self.currency_symbols.get(self.base_currency, self._base_upper)
 
     def get_currency_symbol(self) -> str:
         """获取当前货币符号"""
-        return self.currency_symbols.get(self.base_currency, self.base_currency.upper())
+        return self.currency_symbol
 
     def format_price(self, price: float) -> str:
         """
@@ -149,23 +272,16 @@ class CryptoPriceMonitor:
         Returns:
             格式化后的价格字符串
         """
-        symbol = self.get_currency_symbol()
+        symbol = self.currency_symbol
 
         if price is None:
             return f"{symbol}N/A"
         elif price == 0:
             return f"{symbol}0"
-        elif price >= 1000:
-            return f"{symbol}{price:,.0f}"
-        elif price >= 1:
-            return f"{symbol}{price:,.2f}"
-        elif price >= 0.01:
-            return f"{symbol}{price:.4f}".rstrip('0').rstrip('.')
-        elif price >= 0.0001:
-            return f"{symbol}{price:.6f}".rstrip('0').rstrip('.')
-        else:
-            # 科学计数法显示极小数
-            return f"{symbol}{price:.2e}"
+
+        spec, strip_zeros = self._PRICE_FMTS[bisect.bisect_right(self._PRICE_BINS, price)]
+        text = spec.format(symbol, price)
+        return text.rstrip('0').rstrip('.') if strip_zeros else text
 
     def format_percentage(self, percentage: float) -> str:
         """
@@ -180,23 +296,12 @@ class CryptoPriceMonitor:
         if percentage is None:
             return "⚪ N/A"
 
-        # 选择颜色和符号
-        if percentage > 5:
-            color_symbol = "🚀🟢"  # 大涨
-        elif percentage > 2:
-            color_symbol = "⬆️ 🟢"  # 上涨
-        elif percentage > 0:
-            color_symbol = "↗️ 🟢"  # 微涨
-        elif percentage == 0:
-            color_symbol = "➡️ ⚪"  # 平盘
-        elif percentage > -2:
-            color_symbol = "↘️ 🟠"  # 微跌
-        elif percentage > -5:
-            color_symbol = "⬇️ 🔴"  # 下跌
+        if percentage == 0:
+            color_symbol = self._PCT_FLAT
         else:
-            color_symbol = "💥🔴"  # 大跌
+            color_symbol = self._PCT_LABELS[bisect.bisect_left(self._PCT_THRESHOLDS, percentage)]
 
-        return f"{color_symbol} {percentage:+.2f}%"
+        return PCT_FMT.format(color_symbol, percentage)
 
     def format_large_number(self, number: float) -> str:
         """
@@ -212,53 +317,50 @@ class CryptoPriceMonitor:
             return "N/A"
 
         if number >= 1e9:
-            return f"{number/1e9:.1f}B"
+            return "{:.1f}B".format(number / 1e9)
         elif number >= 1e6:
-            return f"{number/1e6:.1f}M"
+            return "{:.1f}M".format(number / 1e6)
         elif number >= 1e3:
-            return f"{number/1e3:.1f}K"
+            return "{:.1f}K".format(number / 1e3)
         else:
-            return f"{number:.0f}"
+            return "{:.0f}".format(number)
 
-    def display_coins(self, coins: List[Dict], count: int):
+    def display_coins(self, rows: List[Tuple], count: int):
         """
         显示加密货币数据
 
         Args:
-            coins: 币种数据列表
+            rows: 币种行数据列表(fetch_top_coins 的返回值)
             count: 显示的币种数量
         """
         ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        currency_symbol = self.get_currency_symbol()
-
-        print(f'\n📊 [{ts}] Top {count} Cryptocurrencies (in {self.base_currency.upper()})')
-        print("=" * 100)
-
-        # 表头
-        print(f"{'Rank':<4} {'Coin':<18} {'Symbol':<8} {'Price':<18} {'1h':<12} {'24h':<12} {'7d':<12} {'Market Cap':<12}")
-        print("-" * 100)
-
-        for coin in coins:
-            rank = coin.get('market_cap_rank', 'N/A')
-            name = coin.get('name', 'Unknown')[:16]
-            symbol = coin.get('symbol', '').upper()[:6]
-            price = self.format_price(coin.get('current_price'))
-            market_cap = self.format_large_number(coin.get('market_cap'))
-
-            # 获取价格变化百分比
-            change_1h = coin.get('price_change_percentage_1h_in_currency')
-            change_24h = coin.get('price_change_percentage_24h_in_currency')
-            change_7d = coin.get('price_change_percentage_7d_in_currency')
-
-            print(f"{rank:<4} {name:<18} {symbol:<8} {price:<18} "
-                  f"{self.format_percentage(change_1h):<12} "
-                  f"{self.format_percentage(change_24h):<12} "
-                  f"{self.format_percentage(change_7d):<12} "
-                  f"{market_cap:<12}")
-
-        print("=" * 100)
-        print(f"📈 Total displayed: {len(coins)} coins | 💰 Currency: {self.base_currency.upper()} ({currency_symbol})")
-        print(f"🔄 Auto-refresh every {self.refresh_interval} seconds | ⏹️  Press Ctrl+C to stop")
+        currency_symbol = self.currency_symbol
+
+        fmt_price = self.format_price
+        fmt_pct = self.format_percentage
+        fmt_large = self.format_large_number
+
+        out = [
+            f'\n📊 [{ts}] Top {count} Cryptocurrencies (in {self._base_upper})',
+            "=" * 100,
+            ROW_FMT.format('Rank', 'Coin', 'Symbol', 'Price', '1h', '24h', '7d', 'Market Cap'),  # 表头
+            "-" * 100,
+        ]
+
+        out.extend(
+            ROW_FMT.format(rank, name, symbol, fmt_price(price),
+                           fmt_pct(change_1h), fmt_pct(change_24h), fmt_pct(change_7d),
+                           fmt_large(market_cap))
+            for rank, name, symbol, price, market_cap, change_1h, change_24h, change_7d in rows
+        )
+
+        out.append("=" * 100)
+        out.append(f"📈 Total displayed: {len(rows)} coins | 💰 Currency: {self._base_upper} ({currency_symbol})")
+        out.append(f"🔄 Auto-refresh every {self.refresh_interval} seconds | ⏹️  Press Ctrl+C to stop")
+
+        # 一次性写出整张表
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
 
     def get_api_status(self) -> bool:
         """检查API状态"""
@@ -276,7 +378,7 @@ class CryptoPriceMonitor:
             top_count: 监控的前N名币种数量
         """
         print("🚀 Cryptocurrency Price Monitor Started!")
-        print(f"📋 Monitoring top {top_count} coins in {self.base_currency.upper()}")
+        print(f"📋 Monitoring top {top_count} coins in {self._base_upper}")
         print(f"⏰ Refresh interval: {self.refresh_interval} seconds")
 
         # 检查API状态
@@ -290,12 +392,23 @@ class CryptoPriceMonitor:
         consecutive_errors = 0
         max_consecutive_errors = 5
 
+        future = self._executor.submit(self.fetch_top_coins, top_count)
+        last_rows = None
+
         try:
             while True:
-                coins = self.fetch_top_coins(top_count)
-
-                if coins:
-                    self.display_coins(coins, top_count)
+                try:
+                    rows = future.result(timeout=self.refresh_interval)
+                except FuturesTimeoutError:
+                    # 预取超时：沿用上一轮数据，不阻塞刷新（仍计入失败次数）
+                    print("⚠️  数据获取超时，显示上一轮数据")
+                    rows = None
+                    if last_rows:
+                        self.display_coins(last_rows, top_count)
+
+                if rows:
+                    last_rows = rows
+                    self.display_coins(rows, top_count)
                     consecutive_errors = 0  # 重置错误计数
                 else:
                     consecutive_errors += 1
@@ -305,15 +418,24 @@ class CryptoPriceMonitor:
                         print("🚨 连续失败次数过多，程序退出")
                         break
 
+                # 等待期间预取下一轮数据（上一次请求仍未返回时继续等待它）
+                if future.done():
+                    future = self._executor.submit(self.fetch_top_coins, top_count)
+
                 # 显示下次刷新时间
                 next_refresh = time.time() + self.refresh_interval
                 next_time = time.strftime('%H:%M:%S', time.localtime(next_refresh))
                 print(f"\n🕒 Next update at: {next_time}")
 
-                # 倒计时显示
-                for i in range(self.refresh_interval, 0, -1):
-                    print(f"\r🔄 Refreshing in {i:2d} seconds...", end="", flush=True)
-                    time.sleep(1)
+                # 单次等待，倒计时由守护线程刷新
+                countdown_done = threading.Event()
+                countdown = threading.Thread(target=self._countdown,
+                                             args=(self.refresh_interval, countdown_done),
+                                             daemon=True)
+                countdown.start()
+                self._stop_event.wait(self.refresh_interval)
+                countdown_done.set()
+                countdown.join()
                 print("\r" + " " * 30 + "\r", end="", flush=True)
 
         except KeyboardInterrupt:
@@ -321,6 +443,23 @@ class CryptoPriceMonitor:
         except Exception as e:
             print(f"\n💥 Unexpected error: {e}")
             sys.exit(1)
+        finally:
+            self._stop_event.set()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _countdown(self, seconds: int, done: threading.Event):
+        """
+        后台倒计时显示
+
+        Args:
+            seconds: 倒计时秒数
+            done: 结束事件
+        """
+        for i in range(seconds, 0, -1):
+            sys.stdout.write(f"\r🔄 Refreshing in {i:2d} seconds...")
+            sys.stdout.flush()
+            if done.wait(1):
+                break
 
 
 def main():
@@ -1,42 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import functools
+import json
+import os
+import aiohttp
 import requests
-import pandas as pd
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
+from typing import List, Dict, Optional, TYPE_CHECKING
 from datetime import datetime
-import matplotlib.pyplot as plt
 import time
 import random
+import threading
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    _json_loads = json.loads
+
+# pandas / matplotlib / numba 内核仅在历史分析时按需导入，缩短启动时间
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）
+
+    按 rate 个/秒补充令牌，最多积攒 capacity 个；取令牌时允许透支，
+    返回调用方需要等待的秒数。同步与异步调用共用同一个桶。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回需等待的秒数（0 表示可立即发送）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """同步取令牌，不足时阻塞等待"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """异步取令牌，不足时让出事件循环"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
 
 
 class CryptoDataFetcher:
     """加密货币数据获取器 - 修复版"""
     
     BASE_URL = "https://api.coingecko.com/api/v3"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json',
+        'Accept-Language': 'en-US,en;q=0.9'
+    }
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'infosx')
+    CACHE_TTL = 3600         # 历史数据本地缓存有效期(秒)
+    SEARCH_CACHE_SIZE = 512  # 搜索结果内存缓存条数
+    # 免费API限制约 10-30 次/分钟，按 30 次/分钟补充，允许 10 次突发
+    RATE_PER_MINUTE = 30
+    RATE_BURST = 10
+    MAX_RETRIES = 5          # 异步请求遇到429的最大重试次数
     
     def __init__(self):
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json',
-            'Accept-Language': 'en-US,en;q=0.9'
-        })
-        self.request_count = 0
-        self.last_request_time = 0
+        self.session.headers.update(self.HEADERS)
+        # 429/5xx 由 urllib3 按指数退避重试，并遵循服务端 Retry-After
+        retry = Retry(
+            total=5,
+            backoff_factor=2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=20)
+        self.session.mount('https://', adapter)
+        self._bucket = TokenBucket(self.RATE_PER_MINUTE / 60, self.RATE_BURST)
+        # 异步会话，在 async with 中懒加载
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 同步入口共用的后台事件循环，首次使用时启动，保持连接池跨调用复用
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        # 搜索结果缓存: 小写查询词 -> 币种信息
+        self._search_cache: Dict[str, Dict] = {}
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """懒加载异步会话（需在事件循环内调用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=20, limit_per_host=10, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(headers=self.HEADERS, connector=connector)
+        return self._session
+
+    async def aclose(self):
+        """关闭异步会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """懒启动后台事件循环线程"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, daemon=True, name="CryptoDataFetcher-loop"
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def _run_sync(self, coro):
+        """在后台事件循环中执行协程并阻塞等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def close(self):
+        """关闭同步会话、异步会话及后台事件循环"""
+        self.session.close()
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            print(f"⚠️  关闭异步会话失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
 
     def _rate_limit(self):
         """速率限制，避免API限制"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        # 免费API限制：10-30次/分钟，我们保守一点
-        if time_since_last < 2:  # 至少2秒间隔
-            time.sleep(2 - time_since_last)
-        
-        self.last_request_time = time.time()
-        self.request_count += 1
-        
-        # 每10次请求后等待更长时间
-        if self.request_count % 10 == 0:
-            time.sleep(5)
+        self._bucket.acquire()
+
+    async def _get_json(self, url: str, params: Dict, timeout: int = 10):
+        """异步GET请求并解析JSON，遇到429按指数退避（带抖动）重试"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self._bucket.acquire_async()
+            async with self._ensure_session().get(url, params=params,
+                                                  timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                if r.status != 429 or attempt == self.MAX_RETRIES:
+                    r.raise_for_status()
+                    return _json_loads(await r.read())
+            delay = min(60.0, random.uniform(0.5, 1.5) * 2 ** (attempt + 1))
+            print(f"⚠️  API速率限制，{delay:.1f}秒后重试...")
+            await asyncio.sleep(delay)
 
     def get_top_coins(self, limit: int = 50, currency: str = 'usd') -> List[Dict]:
         """
@@ -57,13 +191,8 @@ class CryptoDataFetcher:
         try:
             response = self.session.get(url, params=params, timeout=10)
             
-            if response.status_code == 429:
-                print("⚠️  API速率限制，等待60秒后重试...")
-                time.sleep(60)
-                return self.get_top_coins(limit, currency)
-                
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
             
         except requests.exceptions.RequestException as e:
             print(f"❌ API请求错误: {e}")
@@ -78,13 +207,18 @@ class CryptoDataFetcher:
         
         注意：免费API有天数限制，建议使用365天以内
         """
-        self._rate_limit()
-        
         # 免费API限制：不能直接获取所有历史数据，最大支持365天
         if days == 'max':
             days = '365'
             print("⚠️  免费API限制：最多获取365天数据")
         
+        cache_path = self._cache_path(coin_id, days, currency)
+        df = self._load_cached_history(cache_path)
+        if df is not None:
+            return df
+        
+        self._rate_limit()
+        
         url = f"{self.BASE_URL}/coins/{coin_id}/market_chart"
         params = {
             'vs_currency': currency,
@@ -95,39 +229,85 @@ class CryptoDataFetcher:
         try:
             response = self.session.get(url, params=params, timeout=15)
             
-            if response.status_code == 429:
-                print("⚠️  API速率限制，等待60秒后重试...")
-                time.sleep(60)
-                return self.get_coin_history(coin_id, days, currency)
-                
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             
-            # 转换为DataFrame
-            prices = data.get('prices', [])
-            if not prices:
-                print("❌ 没有获取到价格数据")
-                return None
-                
-            df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('datetime', inplace=True)
-            df.drop('timestamp', axis=1, inplace=True)
-            
-            print(f"✅ 成功获取 {len(df)} 条历史价格数据")
+            df = self._history_to_df(data)
+            self._save_cached_history(cache_path, df)
             return df
             
         except requests.exceptions.RequestException as e:
             print(f"❌ 历史数据获取错误: {e}")
-            if hasattr(e, 'response') and e.response.status_code == 404:
+            if getattr(e.response, 'status_code', None) == 404:
                 print("❌ 币种ID不存在，请检查币种名称")
             return None
         except Exception as e:
             print(f"❌ 未知错误: {e}")
             return None
 
+    def _cache_path(self, coin_id: str, days: str, currency: str) -> str:
+        """历史数据缓存文件路径"""
+        return os.path.join(self.CACHE_DIR, f"{coin_id}_{days}_{currency}.parquet")
+
+    def _load_cached_history(self, path: str) -> Optional[pd.DataFrame]:
+        """读取未过期的本地缓存"""
+        try:
+            if time.time() - os.path.getmtime(path) >= self.CACHE_TTL:
+                return None
+            import pandas as pd
+
+            df = pd.read_parquet(path)
+            print(f"✅ 使用本地缓存的 {len(df)} 条历史价格数据")
+            return df
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  读取缓存失败: {e}")
+            return None
+
+    def _save_cached_history(self, path: str, df: Optional[pd.DataFrame]):
+        """写入本地缓存（失败不影响主流程）"""
+        if df is None or df.empty:
+            return
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            df.to_parquet(path, compression='zstd')
+        except Exception as e:
+            print(f"⚠️  写入缓存失败: {e}")
+
+    def _remember_search(self, query: str, coin: Dict):
+        """记录搜索结果，超出容量时淘汰最早的条目"""
+        if len(self._search_cache) >= self.SEARCH_CACHE_SIZE:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[query] = coin
+
+    @staticmethod
+    def _history_to_df(data: Dict) -> Optional[pd.DataFrame]:
+        """将market_chart响应转换为DataFrame"""
+        import pandas as pd
+
+        prices = data.get('prices', [])
+        if not prices:
+            print("❌ 没有获取到价格数据")
+            return None
+            
+        # 直接转为 (N, 2) 数组按列切片，只构造一次 DataFrame
+        arr = np.asarray(prices, dtype=np.float64)
+        index = pd.to_datetime(arr[:, 0], unit='ms')
+        index.name = 'datetime'
+        df = pd.DataFrame({'price': arr[:, 1]}, index=index)
+        
+        print(f"✅ 成功获取 {len(df)} 条历史价格数据")
+        return df
+
     def search_coin(self, query: str) -> Optional[Dict]:
         """搜索币种信息"""
+        key = query.strip().lower()
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            print(f"✅ 找到币种: {cached['name']} (ID: {cached['id']})")
+            return cached
+        
         self._rate_limit()
         
         url = f"{self.BASE_URL}/search"
@@ -136,17 +316,13 @@ class CryptoDataFetcher:
         try:
             response = self.session.get(url, params=params, timeout=10)
             
-            if response.status_code == 429:
-                print("⚠️  API速率限制，等待60秒后重试...")
-                time.sleep(60)
-                return self.search_coin(query)
-                
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             coins = data.get('coins', [])
             
             if coins:
                 print(f"✅ 找到币种: {coins[0]['name']} (ID: {coins[0]['id']})")
+                self._remember_search(key, coins[0])
                 return coins[0]
             else:
                 print("❌ 未找到匹配的币种")
@@ -155,13 +331,106 @@ class CryptoDataFetcher:
         except requests.exceptions.RequestException as e:
             print(f"❌ 搜索错误: {e}")
             return None
+        except ValueError as e:
+            print(f"❌ 搜索结果解析失败: {e}")
+            return None
+
+    async def get_top_coins_async(self, limit: int = 50, currency: str = 'usd') -> List[Dict]:
+        """异步获取主流Top N币种信息"""
+        params = {
+            'vs_currency': currency,
+            'order': 'market_cap_desc',
+            'per_page': limit,
+            'page': 1,
+            'sparkline': 'false',
+            'price_change_percentage': '1h,24h,7d,30d,200d,1y'
+        }
+        try:
+            return await self._get_json(f"{self.BASE_URL}/coins/markets", params)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ API请求错误: {e}")
+            return []
+
+    async def get_coin_history_async(self, coin_id: str, days: str = '365',
+                                     currency: str = 'usd') -> Optional[pd.DataFrame]:
+        """异步获取币种历史价格数据"""
+        if days == 'max':
+            days = '365'
+            print("⚠️  免费API限制：最多获取365天数据")
+
+        cache_path = self._cache_path(coin_id, days, currency)
+        df = self._load_cached_history(cache_path)
+        if df is not None:
+            return df
+
+        params = {'vs_currency': currency, 'days': days, 'interval': 'daily'}
+        try:
+            data = await self._get_json(f"{self.BASE_URL}/coins/{coin_id}/market_chart", params, timeout=15)
+            df = self._history_to_df(data)
+            self._save_cached_history(cache_path, df)
+            return df
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ 历史数据获取错误 ({coin_id}): {e}")
+            return None
+
+    async def search_coin_async(self, query: str) -> Optional[Dict]:
+        """异步搜索币种信息"""
+        key = query.strip().lower()
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            print(f"✅ 找到币种: {cached['name']} (ID: {cached['id']})")
+            return cached
+
+        try:
+            data = await self._get_json(f"{self.BASE_URL}/search", {'query': query})
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ 搜索错误: {e}")
+            return None
+
+        coins = data.get('coins', [])
+        if coins:
+            print(f"✅ 找到币种: {coins[0]['name']} (ID: {coins[0]['id']})")
+            self._remember_search(key, coins[0])
+            return coins[0]
+        print("❌ 未找到匹配的币种")
+        return None
+
+    async def get_histories_async(self, coin_ids: List[str], days: str = '365',
+                                  currency: str = 'usd') -> Dict[str, Optional[pd.DataFrame]]:
+        """并发获取多个币种的历史数据"""
+        results = await asyncio.gather(
+            *(self.get_coin_history_async(coin_id, days, currency) for coin_id in coin_ids)
+        )
+        return dict(zip(coin_ids, results))
+
+    def get_histories(self, coin_ids: List[str], days: str = '365',
+                      currency: str = 'usd') -> Dict[str, Optional[pd.DataFrame]]:
+        """get_histories_async 的同步入口（在后台事件循环中运行，复用连接池）"""
+        return self._run_sync(self.get_histories_async(coin_ids, days, currency))
+
+
+@functools.cache
+def _fetcher() -> CryptoDataFetcher:
+    """进程内共享的数据获取器，菜单多次操作复用同一连接池"""
+    fetcher = CryptoDataFetcher()
+    atexit.register(fetcher.close)
+    return fetcher
 
 
 class CryptoAnalyzer:
     """加密货币分析器 - 修复版"""
     
+    CHANGE_KEYS = (
+        'price_change_percentage_1h_in_currency',
+        'price_change_percentage_24h_in_currency',
+        'price_change_percentage_7d_in_currency',
+        'price_change_percentage_30d_in_currency'
+    )
+    # Top N 表格行格式（排名/名称/代码/价格/1h/24h/7d/30d）
+    TOP_ROW_FMT = "{:<4} {:<20} {:<8} {:>10.2f} {:>+7.1f}% {:>+7.1f}% {:>+7.1f}% {:>+7.1f}%"
+    
     def __init__(self):
-        self.fetcher = CryptoDataFetcher()
+        self.fetcher = _fetcher()
 
     def display_top_coins(self, limit: int = 20, currency: str = 'usd'):
         """显示Top N币种信息"""
@@ -172,25 +441,28 @@ class CryptoAnalyzer:
             print("❌ 无法获取数据，请检查网络连接或稍后重试")
             return
         
-        print(f"\n🏆 加密货币Top {limit} ({currency.upper()})")
-        print("=" * 120)
-        print(f"{'排名':<4} {'名称':<20} {'代码':<8} {'当前价格':<12} {'1小时':<8} {'24小时':<8} {'7天':<8} {'30天':<8}")
-        print("-" * 120)
+        # 先按列一次性抽取（SoA），再整表拼接后一次输出
+        n = len(coins)
+        ranks = [coin.get('market_cap_rank', 'N/A') for coin in coins]
+        names = [coin.get('name', '')[:18] for coin in coins]
+        symbols = [coin.get('symbol', '').upper() for coin in coins]
+        prices = np.fromiter((coin.get('current_price') or 0 for coin in coins),
+                             dtype=np.float64, count=n)
+        # 价格变化百分比：1小时/24小时/7天/30天
+        changes = np.array([[coin.get(key) or 0 for key in self.CHANGE_KEYS] for coin in coins],
+                           dtype=np.float64).reshape(n, len(self.CHANGE_KEYS))
         
-        for coin in coins:
-            rank = coin.get('market_cap_rank', 'N/A')
-            name = coin.get('name', '')[:18]
-            symbol = coin.get('symbol', '').upper()
-            price = coin.get('current_price', 0)
-            
-            # 价格变化百分比
-            change_1h = coin.get('price_change_percentage_1h_in_currency', 0) or 0
-            change_24h = coin.get('price_change_percentage_24h_in_currency', 0) or 0
-            change_7d = coin.get('price_change_percentage_7d_in_currency', 0) or 0
-            change_30d = coin.get('price_change_percentage_30d_in_currency', 0) or 0
-            
-            print(f"{rank:<4} {name:<20} {symbol:<8} {price:>10.2f} {change_1h:>+7.1f}% {change_24h:>+7.1f}% "
-                  f"{change_7d:>+7.1f}% {change_30d:>+7.1f}%")
+        row_fmt = self.TOP_ROW_FMT.format
+        lines = [
+            f"\n🏆 加密货币Top {limit} ({currency.upper()})",
+            "=" * 120,
+            f"{'排名':<4} {'名称':<20} {'代码':<8} {'当前价格':<12} {'1小时':<8} {'24小时':<8} {'7天':<8} {'30天':<8}",
+            "-" * 120,
+        ]
+        lines.extend(row_fmt(rank, name, symbol, price, *change)
+                     for rank, name, symbol, price, change
+                     in zip(ranks, names, symbols, prices.tolist(), changes.tolist()))
+        print("\n".join(lines))
 
     def analyze_coin_history(self, coin_query: str, currency: str = 'usd', days: str = '365'):
         """分析币种历史走势"""
@@ -223,47 +495,63 @@ class CryptoAnalyzer:
         
         return df
 
+    def analyze_many(self, coin_ids: List[str], currency: str = 'usd',
+                     days: str = '365') -> Dict[str, Optional[pd.DataFrame]]:
+        """并发获取多个币种(CoinGecko ID)的历史数据并显示统计"""
+        print(f"\n📈 正在并发获取 {len(coin_ids)} 个币种的历史价格数据 ({days}天)...")
+        histories = self.fetcher.get_histories(coin_ids, days, currency)
+        
+        for coin_id, df in histories.items():
+            if df is not None and not df.empty:
+                self._display_history_stats(df, coin_id, currency)
+        
+        return histories
+
     def _display_history_stats(self, df: pd.DataFrame, coin_name: str, currency: str):
         """显示历史数据统计"""
         print(f"\n📊 {coin_name} 历史数据统计:")
         print("-" * 50)
         
-        start_price = df['price'].iloc[0]
-        end_price = df['price'].iloc[-1]
-        max_price = df['price'].max()
-        min_price = df['price'].min()
-        total_change = ((end_price - start_price) / start_price) * 100
+        from _kernels import history_stats
+
+        # 单次遍历计算统计量（numba 可用时为编译内核）
+        px = np.ascontiguousarray(df['price'].to_numpy(dtype=np.float64))
+        start_price, end_price, min_price, max_price, total_change = history_stats(px)
         
-        print(f"时间范围: {df.index[0].strftime('%Y-%m-%d')} 至 {df.index[-1].strftime('%Y-%m-%d')}")
-        print(f"数据点数: {len(df):,}")
-        print(f"起始价格: {start_price:.2f} {currency.upper()}")
-        print(f"当前价格: {end_price:.2f} {currency.upper()}")
-        print(f"历史最高: {max_price:.2f} {currency.upper()}")
-        print(f"历史最低: {min_price:.2f} {currency.upper()}")
-        print(f"累计涨跌: {total_change:+.2f}%")
+        dates = df.index
+        unit = currency.upper()
+        print(f"时间范围: {dates[0].strftime('%Y-%m-%d')} 至 {dates[-1].strftime('%Y-%m-%d')}\n"
+              f"数据点数: {px.shape[0]:,}\n"
+              f"起始价格: {start_price:.2f} {unit}\n"
+              f"当前价格: {end_price:.2f} {unit}\n"
+              f"历史最高: {max_price:.2f} {unit}\n"
+              f"历史最低: {min_price:.2f} {unit}\n"
+              f"累计涨跌: {total_change:+.2f}%")
 
     def _display_data_preview(self, df: pd.DataFrame, currency: str):
         """显示数据预览"""
         print(f"\n📋 数据预览:")
         print("-" * 40)
         
-        # 显示前5条
-        print("最早的数据:")
-        for i in range(min(5, len(df))):
-            date = df.index[i].strftime('%Y-%m-%d')
-            price = df['price'].iloc[i]
-            print(f"  {date}: {price:.2f} {currency.upper()}")
-        
-        # 显示后5条  
-        print("\n最新的数据:")
-        for i in range(max(0, len(df)-5), len(df)):
-            date = df.index[i].strftime('%Y-%m-%d')
-            price = df['price'].iloc[i]
-            print(f"  {date}: {price:.2f} {currency.upper()}")
+        n = len(df)
+        dates = df.index
+        prices = df['price'].to_numpy()
+        unit = currency.upper()
+
+        def _rows(start: int, stop: int) -> str:
+            # 切片后整体 strftime，避免逐行访问索引
+            days = dates[start:stop].strftime('%Y-%m-%d')
+            return "\n".join(f"  {day}: {price:.2f} {unit}"
+                             for day, price in zip(days, prices[start:stop].tolist()))
+
+        # 显示前5条 / 后5条
+        print(f"最早的数据:\n{_rows(0, min(5, n))}\n\n最新的数据:\n{_rows(max(0, n - 5), n)}")
 
     def _plot_price_history(self, df: pd.DataFrame, coin_name: str, currency: str):
         """绘制价格历史图表"""
         try:
+            import matplotlib.pyplot as plt
+
             plt.figure(figsize=(12, 6))
             plt.plot(df.index, df['price'], linewidth=1, color='#007acc')
             plt.title(f'{coin_name} 价格历史走势', fontsize=14, fontweight='bold')
@@ -0,0 +1,365 @@
+# _kernels.py
+"""
+特征计算内核
+
+- rolling_mean / rolling_std: 离线训练用的滚动窗口。语义与 pandas rolling(window).mean()/std()
+  一致：前 window-1 个位置以及窗口内含 NaN 的位置输出 NaN，std 使用样本标准差 (ddof=1)。
+  bottleneck 可用时使用其单遍 C 实现 move_mean / move_std，否则回退为 numpy 滑动窗口实现。
+- stats_push: 中间价增量统计 (feature_engine.StreamingStats) 的 O(1) 更新，状态全部存放在定长数组中。
+- realtime_features: 在线推理单 tick 特征向量，输入为定长数组和标量，结果写入调用方预分配的缓冲区，
+  不产生临时数组。RSI / 波动率由增量统计提供。
+- realtime_update: 盘口解析之后的整段数值计算（中间价 -> 增量统计 -> OFI / 特征）合并为一次调用。
+- train_row_features: 离线训练的逐行特征（价差、失衡、对数量、成交流、OFI），行间无依赖，
+  numba 可用时以 parallel=True 按行多核并行；不可用时由 feature_engine 走 numpy 向量化实现。
+
+numba 可用时以 nopython 模式编译（cache=True 落盘，跨进程复用编译结果），
+否则以纯 Python 执行同一份代码。
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba 为可选依赖
+    NUMBA_AVAILABLE = False
+    prange = range
+
+try:
+    import bottleneck as bn
+    BOTTLENECK_AVAILABLE = True
+except ImportError:  # bottleneck 为可选依赖
+    BOTTLENECK_AVAILABLE = False
+
+
+def _rolling_mean_numpy(x: np.ndarray, window: int) -> np.ndarray:
+    """numpy 版本：滚动均值"""
+    out = np.full(x.shape[0], np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def _rolling_std_numpy(x: np.ndarray, window: int) -> np.ndarray:
+    """numpy 版本：滚动样本标准差"""
+    out = np.full(x.shape[0], np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window).std(axis=1, ddof=1)
+    return out
+
+
+if BOTTLENECK_AVAILABLE:
+    # min_count 默认等于窗口长度，与 pandas 的 min_periods 默认值一致
+    def rolling_mean(x, window):
+        """滚动均值，窗口内含 NaN 时输出 NaN"""
+        return bn.move_mean(x, window)
+
+    def rolling_std(x, window):
+        """滚动样本标准差 (ddof=1)，窗口内含 NaN 时输出 NaN"""
+        return bn.move_std(x, window, ddof=1)
+else:
+    rolling_mean = _rolling_mean_numpy
+    rolling_std = _rolling_std_numpy
+
+
+# 增量统计状态数组的下标
+# acc (float64): 窗口和、平方和、涨幅和、跌幅和、参考价、RSI、标准差
+ACC_SUM, ACC_SUM_SQ, ACC_GAIN, ACC_LOSS, ACC_REF, ACC_RSI, ACC_STD = range(7)
+ACC_SIZE = 7
+# cnt (int64): 价格写入位置、差分写入位置、有效点数、距上次重算的 tick 数、涨差分个数、跌差分个数
+CNT_HEAD, CNT_DHEAD, CNT_FILLED, CNT_TICKS, CNT_N_GAIN, CNT_N_LOSS = range(6)
+CNT_SIZE = 6
+# 每隔多少个 tick 从缓冲区完整重算一次累加量
+REFRESH_TICKS = 4096
+
+
+def _stats_push_py(buf, diffs, acc, cnt, price):
+    """
+    推入一个中间价，O(1) 更新最近 len(buf) 点的总体标准差和最近 len(diffs) 个差分的 RSI。
+
+    - 波动率：滚动维护 (价格 - 参考价) 的和与平方和，var = E[x²] - E[x]²
+    - RSI：滚动维护窗口内的涨幅和 / 跌幅和，另记涨、跌差分个数，边界判断不受浮点残差影响
+    - 每 REFRESH_TICKS 个 tick 完整重算一次，以当前窗口均值为新参考价，消除累积漂移
+    """
+    w = buf.shape[0]
+    nd = diffs.shape[0]
+    head = cnt[CNT_HEAD]
+    if cnt[CNT_FILLED] == 0:
+        acc[ACC_REF] = price
+    else:
+        # 新差分进入 RSI 窗口，最早的差分移出
+        dh = cnt[CNT_DHEAD]
+        delta = price - buf[head - 1 if head > 0 else w - 1]
+        old = diffs[dh]
+        if old > 0:
+            acc[ACC_GAIN] -= old
+            cnt[CNT_N_GAIN] -= 1
+        elif old < 0:
+            acc[ACC_LOSS] += old
+            cnt[CNT_N_LOSS] -= 1
+        if delta > 0:
+            acc[ACC_GAIN] += delta
+            cnt[CNT_N_GAIN] += 1
+        elif delta < 0:
+            acc[ACC_LOSS] -= delta
+            cnt[CNT_N_LOSS] += 1
+        diffs[dh] = delta
+        cnt[CNT_DHEAD] = dh + 1 if dh + 1 < nd else 0
+
+    # 新价格进入波动率窗口，窗口已满时最早的价格移出
+    ref = acc[ACC_REF]
+    if cnt[CNT_FILLED] == w:
+        x = buf[head] - ref
+        acc[ACC_SUM] -= x
+        acc[ACC_SUM_SQ] -= x * x
+    else:
+        cnt[CNT_FILLED] += 1
+    x = price - ref
+    acc[ACC_SUM] += x
+    acc[ACC_SUM_SQ] += x * x
+    buf[head] = price
+    cnt[CNT_HEAD] = head + 1 if head + 1 < w else 0
+
+    cnt[CNT_TICKS] += 1
+    n = cnt[CNT_FILLED]
+    if cnt[CNT_TICKS] >= REFRESH_TICKS:
+        cnt[CNT_TICKS] = 0
+        # 和与平方和与顺序无关：有效点总是 buf[:n]
+        ref = 0.0
+        for k in range(n):
+            ref += buf[k]
+        ref /= n
+        s = 0.0
+        ss = 0.0
+        for k in range(n):
+            x = buf[k] - ref
+            s += x
+            ss += x * x
+        acc[ACC_REF] = ref
+        acc[ACC_SUM] = s
+        acc[ACC_SUM_SQ] = ss
+        g = 0.0
+        l = 0.0
+        for k in range(nd):
+            d = diffs[k]
+            if d > 0:
+                g += d
+            elif d < 0:
+                l -= d
+        acc[ACC_GAIN] = g
+        acc[ACC_LOSS] = l
+
+    if n < w:
+        return n
+    mean = acc[ACC_SUM] / w
+    var = acc[ACC_SUM_SQ] / w - mean * mean
+    acc[ACC_STD] = np.sqrt(var) if var > 0 else 0.0
+    gains = acc[ACC_GAIN] if cnt[CNT_N_GAIN] > 0 else 0.0
+    losses = acc[ACC_LOSS] if cnt[CNT_N_LOSS] > 0 else 0.0
+    if losses == 0:
+        acc[ACC_RSI] = 100.0 if gains > 0 else 50.0
+    else:
+        acc[ACC_RSI] = 100 - (100 / (1 + gains / losses))
+    return n
+
+
+def _realtime_features_py(asks, bids, prev_asks, prev_bids, has_prev, rsi, volatility, lt_sz, lt_side, out):
+    """
+    单 tick 实盘特征，按 config.FEATURES 顺序写入 out。
+
+    Args:
+        asks / bids: (5, >=2) float64 数组，每行 [价格, 数量, ...]
+        prev_asks / prev_bids: (5, 2) float64 上一帧盘口，计算 OFI 后原地更新为当前帧
+        has_prev: 上一帧是否有效（首帧 OFI 记 0）
+        rsi / volatility: 最近 15 点的 RSI、最近 20 点的总体标准差
+        out: (13,) float32 输出缓冲
+
+    Returns:
+        bool: 特征中不含 NaN 时为 True。不再逐个扫描 out：有限输入下每个分支都不会产生 NaN
+              （除法分母有 > 0 保护，log1p 的参数非负），NaN 只可能来自输入本身，
+              而它必然传播到 spread / 5 档总量 / OFI 范数 / 成交流 / RSI / 波动率这几个标量之一
+    """
+    ap0 = asks[0, 0]
+    as0 = asks[0, 1]
+    bp0 = bids[0, 0]
+    bs0 = bids[0, 1]
+
+    # 1. Spread
+    spread = ap0 - bp0
+
+    # 2. Imbalance L1
+    s1 = bs0 + as0
+    imbalance_l1 = (bs0 - as0) / s1 if s1 > 0 else 0.0
+
+    # 3. Imbalance L5
+    sum_as = 0.0
+    sum_bs = 0.0
+    for k in range(asks.shape[0]):
+        sum_as += asks[k, 1]
+    for k in range(bids.shape[0]):
+        sum_bs += bids[k, 1]
+    s5 = sum_bs + sum_as
+    imbalance_l5 = (sum_bs - sum_as) / s5 if s5 > 0 else 0.0
+
+    # 5. Trade Flow & Volumes：与离线训练 (FeatureEngine._trade_flow) 一致，sign(side) * log1p(|sz|)
+    if lt_side > 0:
+        trade_flow = np.log1p(abs(lt_sz))
+    elif lt_side < 0:
+        trade_flow = -np.log1p(abs(lt_sz))
+    else:
+        trade_flow = 0.0
+
+    out[0] = spread
+    out[1] = imbalance_l1
+    out[2] = imbalance_l5
+    out[3] = np.log1p(as0)
+    out[4] = np.log1p(bs0)
+    out[5] = rsi
+    out[6] = volatility
+    out[7] = trade_flow
+
+    # 6. 多档 OFI：逐档比较价格，三分支取量的变化，再按 L∞ 范数归一化
+    levels = prev_asks.shape[0]
+    norm = 0.0
+    for k in range(levels):
+        ofi = 0.0
+        if has_prev:
+            bp = bids[k, 0]
+            bv = bids[k, 1]
+            pbp = prev_bids[k, 0]
+            if bp > pbp:
+                b_of = bv
+            elif bp == pbp:
+                b_of = bv - prev_bids[k, 1]
+            else:
+                b_of = -prev_bids[k, 1]
+            ap = asks[k, 0]
+            av = asks[k, 1]
+            pap = prev_asks[k, 0]
+            if ap < pap:
+                a_of = av
+            elif ap == pap:
+                a_of = av - prev_asks[k, 1]
+            else:
+                a_of = -prev_asks[k, 1]
+            ofi = b_of - a_of
+        out[8 + k] = ofi
+        # 含 NaN 时范数记为 NaN（上一帧盘口中的 NaN 也会经由这里暴露）
+        if ofi != ofi or abs(ofi) > norm:
+            norm = abs(ofi)
+        prev_asks[k, 0] = asks[k, 0]
+        prev_asks[k, 1] = asks[k, 1]
+        prev_bids[k, 0] = bids[k, 0]
+        prev_bids[k, 1] = bids[k, 1]
+    if norm > 0:
+        for k in range(levels):
+            out[8 + k] = out[8 + k] / norm
+    # x == x 当且仅当 x 不是 NaN
+    return (spread == spread and s5 == s5 and norm == norm and trade_flow == trade_flow
+            and rsi == rsi and volatility == volatility)
+
+
+def _realtime_update_py(asks, bids, buf, diffs, acc, cnt, prev_asks, prev_bids, has_prev,
+                        lt_sz, lt_side, out):
+    """
+    单个 books5 tick 的全部数值计算：中间价推入增量统计；点数足够时计算特征写入 out。
+
+    Returns:
+        (有效点数, 特征是否已写入且不含 NaN)。点数不足 len(buf) 时不计算特征，也不更新 OFI 上一帧
+    """
+    n = stats_push(buf, diffs, acc, cnt, (asks[0, 0] + bids[0, 0]) / 2)
+    if n < buf.shape[0]:
+        return n, False
+    ok = realtime_features(asks, bids, prev_asks, prev_bids, has_prev,
+                           acc[ACC_RSI], acc[ACC_STD], lt_sz, lt_side, out)
+    return n, ok
+
+
+def _train_row_features_py(raw, out):
+    """
+    离线逐行特征，写入 out 中除 rsi_14 (5) / volatility (6) 以外的列，列顺序同 config.FEATURES。
+
+    Args:
+        raw: (N, 22) float64，列顺序同 feature_engine.RAW_COLUMNS
+             (ap0-4, bp0-4, as0-4, bs0-4, lt_sz, lt_side)
+        out: (N, 13) float32 输出块
+    """
+    n = raw.shape[0]
+    for i in prange(n):
+        ap0 = raw[i, 0]
+        bp0 = raw[i, 5]
+        as0 = raw[i, 10]
+        bs0 = raw[i, 15]
+
+        # Spread / Imbalance：分母为 0 时记 0（与 numpy 版本的 where=denom != 0 一致）
+        out[i, 0] = ap0 - bp0
+        s1 = bs0 + as0
+        out[i, 1] = (bs0 - as0) / s1 if s1 != 0 else 0.0
+        sum_as = 0.0
+        sum_bs = 0.0
+        for k in range(5):
+            sum_as += raw[i, 10 + k]
+            sum_bs += raw[i, 15 + k]
+        s5 = sum_bs + sum_as
+        out[i, 2] = (sum_bs - sum_as) / s5 if s5 != 0 else 0.0
+
+        # 对数量与成交流 sign(side) * log1p(|sz|)
+        out[i, 3] = np.log1p(as0)
+        out[i, 4] = np.log1p(bs0)
+        out[i, 7] = np.log1p(abs(raw[i, 20])) * np.sign(raw[i, 21])
+
+        # 多档 OFI：与上一行逐档比较，按 L∞ 范数归一化；首行记 0
+        norm = 0.0
+        for k in range(5):
+            ofi = 0.0
+            if i > 0:
+                ap = raw[i, k]
+                pap = raw[i - 1, k]
+                av = raw[i, 10 + k]
+                pav = raw[i - 1, 10 + k]
+                if ap < pap:
+                    a_of = av
+                elif ap == pap:
+                    a_of = av - pav
+                else:
+                    a_of = -pav
+                bp = raw[i, 5 + k]
+                pbp = raw[i - 1, 5 + k]
+                bv = raw[i, 15 + k]
+                pbv = raw[i - 1, 15 + k]
+                if bp > pbp:
+                    b_of = bv
+                elif bp == pbp:
+                    b_of = bv - pbv
+                else:
+                    b_of = -pbv
+                ofi = b_of - a_of
+            out[i, 8 + k] = ofi
+            # 与 numpy 的 max 一致：含 NaN 时范数为 NaN，整行不做归一化
+            if ofi != ofi or abs(ofi) > norm:
+                norm = abs(ofi)
+        if norm > 0:
+            for k in range(5):
+                out[i, 8 + k] = out[i, 8 + k] / norm
+
+
+if NUMBA_AVAILABLE:
+    # 逐行特征：按行并行；不开 fastmath，NaN 输入需照常传播到输出再统一清洗
+    train_row_features = njit(parallel=True, cache=True)(_train_row_features_py)
+    train_row_features(np.ones((2, 22), order='F'), np.empty((2, 13), dtype=np.float32, order='F'))
+
+    # 不开 fastmath：需要保留 NaN 判断
+    stats_push = njit(cache=True)(_stats_push_py)
+    realtime_features = njit(cache=True)(_realtime_features_py)
+    realtime_update = njit(cache=True)(_realtime_update_py)
+    # 导入时预热编译，避免第一个 tick 的 JIT 延迟
+    realtime_update(np.ones((5, 4)), np.ones((5, 4)), np.zeros(20), np.zeros(14),
+                    np.zeros(ACC_SIZE), np.zeros(CNT_SIZE, dtype=np.int64),
+                    np.ones((5, 2)), np.ones((5, 2)), True, 1.0, 1.0, np.empty(13, dtype=np.float32))
+    realtime_features(np.ones((5, 2)), np.ones((5, 2)), np.ones((5, 2)), np.ones((5, 2)), True,
+                      50.0, 0.0, 1.0, 1.0, np.empty(13, dtype=np.float32))
+    stats_push(np.zeros(20), np.zeros(14), np.zeros(ACC_SIZE), np.zeros(CNT_SIZE, dtype=np.int64), 1.0)
+else:
+    train_row_features = None  # 由 feature_engine 走 numpy 向量化实现
+    stats_push = _stats_push_py
+    realtime_features = _realtime_features_py
+    realtime_update = _realtime_update_py
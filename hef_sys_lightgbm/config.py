@@ -18,7 +18,13 @@ PREDICT_HORIZON = 30
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 MODEL_DIR = os.path.join(BASE_DIR, "model")
-MODEL_NAME = "hft_lgbm_v1.onnx"
+# v2: 特征清单增加多档 OFI，输入维度变化，旧模型需重新训练
+MODEL_NAME = "hft_lgbm_v2.onnx"
+# LightGBM 文本模型及其 lleaves 编译缓存 (本地代码预测)
+BOOSTER_NAME = "hft_lgbm_v2.txt"
+COMPILED_NAME = "hft_lgbm_v2.so"
+# True: 即使安装了 lleaves 也强制使用 ONNX Runtime
+USE_ONNX = False
 
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
@@ -32,5 +38,14 @@ FEATURES = [
     'bid_sz_0',         
     'rsi_14',           
     'volatility',       
-    'trade_flow'        
-]
\ No newline at end of file
+    'trade_flow',
+    # 多档订单流失衡 (Order Flow Imbalance)，按 L∞ 范数归一化
+    'ofi_0',
+    'ofi_1',
+    'ofi_2',
+    'ofi_3',
+    'ofi_4'
+]
+
+# OFI 使用的盘口档数
+OFI_LEVELS = 5
\ No newline at end of file
@@ -1,15 +1,63 @@
 # data_collector.py
 import asyncio
-import websockets
+from websockets.asyncio.client import connect
 import json
 import csv
 import time
 import os
+import numpy as np
 from datetime import datetime
 import config
 
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+    dumps = json.dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow 为可选依赖，缺失时仍写 CSV
+    PYARROW_AVAILABLE = False
+
 WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
 
+# 成交方向查表：buy=1, sell=-1，未知方向记 0
+_SIDE = {'buy': 1, 'sell': -1}
+
+# 批量写盘：1 MiB 文件缓冲，攒够 FLUSH_ROWS 行或超过 FLUSH_INTERVAL 秒才写入并 flush 一次
+FILE_BUFFER_SIZE = 1 << 20
+FLUSH_ROWS = 256
+FLUSH_INTERVAL = 1.0
+# Parquet 每批写成一个 row group；footer 在关闭时写入，定时 flush 没有意义，只按行数攒批
+PARQUET_BATCH_ROWS = 8192
+
+HEADERS = [
+    "ts_loc", "ts_exch", 
+    "ap0", "as0", "ap1", "as1", "ap2", "as2", "ap3", "as3", "ap4", "as4",
+    "bp0", "bs0", "bp1", "bs1", "bp2", "bs2", "bp3", "bs3", "bp4", "bs4",
+    "lt_px", "lt_sz", "lt_side"
+]
+
+
+def _column_type(name):
+    """列类型与 train_pipeline.CSV_DTYPES 一致：价格 float64，数量 float32，方向 int8"""
+    if name == "ts_exch":
+        return pa.int64()
+    if name == "lt_side":
+        return pa.int8()
+    if name.startswith(("ap", "bp", "lt_px", "ts_")):
+        return pa.float64()
+    return pa.float32()
+
+
+if PYARROW_AVAILABLE:
+    SCHEMA = pa.schema([(name, _column_type(name)) for name in HEADERS])
+
 # 内存缓存：记录最近一笔成交信息
 last_trade_state = {
     "px": 0.0,
@@ -17,27 +65,65 @@ last_trade_state = {
     "side": 0 
 }
 
-async def record_loop():
-    print(f"🚀 [Collector] 启动录制: {config.SYMBOL}")
-    
-    # 初始化文件名
-    current_date = datetime.now().strftime('%Y%m%d')
+
+def _open_writer(current_date):
+    """
+    打开当天的数据文件。
+
+    - pyarrow 可用：每次启动/切换日期新建一个 Parquet 文件 (zstd 压缩)，每批行写成一个 row group。
+      Parquet 不能追加，文件名带启动时刻；footer 在关闭时写入，进程被强杀时该文件不可读。
+    - 否则：追加写入当天的 CSV，新文件写表头。
+
+    Returns:
+        (write_rows, close)：write_rows(rows) 写入一批行并落盘
+    """
+    if PYARROW_AVAILABLE:
+        file_path = os.path.join(
+            config.DATA_DIR, f"{config.SYMBOL}_{current_date}_{datetime.now().strftime('%H%M%S')}.parquet")
+        writer = pq.ParquetWriter(file_path, SCHEMA, compression='zstd', use_dictionary=True)
+
+        def write_rows(rows):
+            # 行转列后按 schema 类型整列构造，不经过逐行 dict
+            arrays = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), SCHEMA)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=SCHEMA))
+
+        return write_rows, writer.close
+
     file_path = os.path.join(config.DATA_DIR, f"{config.SYMBOL}_{current_date}.csv")
-    
-    headers = [
-        "ts_loc", "ts_exch", 
-        "ap0", "as0", "ap1", "as1", "ap2", "as2", "ap3", "as3", "ap4", "as4",
-        "bp0", "bs0", "bp1", "bs1", "bp2", "bs2", "bp3", "bs3", "bp4", "bs4",
-        "lt_px", "lt_sz", "lt_side"
-    ]
-
-    # buffering=1: 行缓冲，来一行写一行，防数据丢失
-    f = open(file_path, 'a+', newline='', buffering=1)
+    # 大块缓冲 + 定量/定时批量写入，代替逐行写盘的行缓冲
+    f = open(file_path, 'a+', newline='', buffering=FILE_BUFFER_SIZE)
     writer = csv.writer(f)
-    
     # 如果是新文件，写入表头
     if os.path.getsize(file_path) == 0:
-        writer.writerow(headers)
+        writer.writerow(HEADERS)
+
+    def write_rows(rows):
+        writer.writerows(rows)
+        f.flush()
+
+    return write_rows, f.close
+
+
+async def record_loop():
+    print(f"🚀 [Collector] 启动录制: {config.SYMBOL} ({'Parquet' if PYARROW_AVAILABLE else 'CSV'})")
+    
+    current_date = datetime.now().strftime('%Y%m%d')
+    write_rows, close = _open_writer(current_date)
+
+    # Parquet 只按行数攒批；CSV 另外按时间间隔落盘
+    batch_rows = PARQUET_BATCH_ROWS if PYARROW_AVAILABLE else FLUSH_ROWS
+    flush_interval = float('inf') if PYARROW_AVAILABLE else FLUSH_INTERVAL
+
+    pending = []  # 待写入的行
+    last_flush = time.time()
+
+    def flush_pending():
+        """把缓存的行一次写入"""
+        nonlocal last_flush
+        if pending:
+            write_rows(pending)
+            pending.clear()
+        last_flush = time.time()
 
     subscribe_msg = {
         "op": "subscribe",
@@ -46,57 +132,66 @@ async def record_loop():
             {"channel": "trades", "instId": config.SYMBOL}
         ]
     }
+    # 订阅帧只序列化一次，断线重连时直接复用
+    subscribe_frame = dumps(subscribe_msg)
 
-    while True:
-        try:
-            async with websockets.connect(WS_URL) as ws:
-                await ws.send(json.dumps(subscribe_msg))
-                print(f"✅ [Collector] WebSocket 已连接 - {datetime.now()}")
+    try:
+        while True:
+            try:
+                async with connect(WS_URL) as ws:
+                    await ws.send(subscribe_frame)
+                    print(f"✅ [Collector] WebSocket 已连接 - {datetime.now()}")
 
-                while True:
-                    msg = await ws.recv()
-                    data = json.loads(msg)
+                    while True:
+                        # 不做 UTF-8 解码，原始 bytes 直接交给 JSON 解析
+                        msg = await ws.recv(decode=False)
+                        data = loads(msg)
                     
-                    if 'data' not in data: continue
-                    channel = data['arg']['channel']
-                    res = data['data'][0]
-
-                    # 更新最新成交
-                    if channel == 'trades':
-                        last_trade_state['px'] = float(res['px'])
-                        last_trade_state['sz'] = float(res['sz'])
-                        last_trade_state['side'] = 1 if res['side'] == 'buy' else -1
-
-                    # 盘口更新 -> 触发写入
-                    elif channel == 'books5':
-                        ts_loc = time.time()
-                        ts_exch = int(res['ts'])
+                        if 'data' not in data: continue
+                        channel = data['arg']['channel']
+                        res = data['data'][0]
+
+                        # 更新最新成交
+                        if channel == 'trades':
+                            last_trade_state['px'] = float(res['px'])
+                            last_trade_state['sz'] = float(res['sz'])
+                            last_trade_state['side'] = _SIDE.get(res['side'], 0)
+
+                        # 盘口更新 -> 触发写入
+                        elif channel == 'books5':
+                            ts_loc = time.time()
+                            ts_exch = int(res['ts'])
                         
-                        # 扁平化 5 档数据
-                        asks = [float(x) for item in res['asks'] for x in item[:2]]
-                        bids = [float(x) for item in res['bids'] for x in item[:2]]
+                            # 扁平化 5 档数据：字符串一次性交给 numpy 转换，取 [价格, 数量] 两列
+                            asks = np.asarray(res['asks'], dtype=np.float64)[:, :2].ravel().tolist()
+                            bids = np.asarray(res['bids'], dtype=np.float64)[:, :2].ravel().tolist()
                         
-                        row = [ts_loc, ts_exch] + asks + bids + [
-                            last_trade_state['px'], 
-                            last_trade_state['sz'], 
-                            last_trade_state['side']
-                        ]
-                        writer.writerow(row)
-
-        except Exception as e:
-            print(f"⚠️ [Collector] 连接断开: {e}，3秒后重连...")
-            await asyncio.sleep(3)
+                            row = [ts_loc, ts_exch] + asks + bids + [
+                                last_trade_state['px'], 
+                                last_trade_state['sz'], 
+                                last_trade_state['side']
+                            ]
+                            pending.append(row)
+                            if len(pending) >= batch_rows or ts_loc - last_flush >= flush_interval:
+                                flush_pending()
+
+            except Exception as e:
+                print(f"⚠️ [Collector] 连接断开: {e}，3秒后重连...")
+                # 断线期间没有新数据，先把缓存的行落盘
+                flush_pending()
+                await asyncio.sleep(3)
             
-            # 检查日期变更，切换文件
-            new_date = datetime.now().strftime('%Y%m%d')
-            if new_date != current_date:
-                f.close()
-                current_date = new_date
-                file_path = os.path.join(config.DATA_DIR, f"{config.SYMBOL}_{current_date}.csv")
-                f = open(file_path, 'a+', newline='', buffering=1)
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                print(f"📅 [Collector] 切换新文件: {current_date}")
+                # 检查日期变更，切换文件
+                new_date = datetime.now().strftime('%Y%m%d')
+                if new_date != current_date:
+                    close()
+                    current_date = new_date
+                    write_rows, close = _open_writer(current_date)
+                    print(f"📅 [Collector] 切换新文件: {current_date}")
+    finally:
+        # 退出 (Ctrl+C 取消任务) 时把剩余行写完再关闭文件
+        flush_pending()
+        close()
 
 if __name__ == "__main__":
     try:
@@ -2,108 +2,251 @@
 import numpy as np
 import pandas as pd
 import config
+from _kernels import (ACC_RSI, ACC_SIZE, ACC_STD, CNT_FILLED, CNT_SIZE, NUMBA_AVAILABLE,
+                      realtime_features, realtime_update, rolling_mean, rolling_std, stats_push,
+                      train_row_features)
+
+# 离线特征用到的原始列（顺序即 calculate_train_features 中的列下标）
+RAW_COLUMNS = ['ap0', 'ap1', 'ap2', 'ap3', 'ap4',
+               'bp0', 'bp1', 'bp2', 'bp3', 'bp4',
+               'as0', 'as1', 'as2', 'as3', 'as4',
+               'bs0', 'bs1', 'bs2', 'bs3', 'bs4',
+               'lt_sz', 'lt_side']
+
+class StreamingStats:
+    """
+    中间价增量统计（在线推理用）。
+
+    每个 tick O(1) 更新最近 WINDOW 点的总体标准差和最近 RSI_DIFFS 个差分的 RSI，
+    算法见 _kernels.stats_push。状态全部存放在定长数组中，可以整体交给编译内核原地更新。
+    """
+    WINDOW = 20          # 波动率窗口（也是特征可用所需的最少点数）
+    RSI_DIFFS = 14       # RSI 差分个数（最近 15 点）
+
+    __slots__ = ('buf', 'diffs', 'acc', 'cnt')
+
+    def __init__(self):
+        self.buf = np.zeros(self.WINDOW, dtype=np.float64)      # 最近 WINDOW 个价格（环形）
+        self.diffs = np.zeros(self.RSI_DIFFS, dtype=np.float64)  # 最近 RSI_DIFFS 个差分（环形）
+        self.acc = np.zeros(ACC_SIZE, dtype=np.float64)
+        self.cnt = np.zeros(CNT_SIZE, dtype=np.int64)
+        self.acc[ACC_RSI] = 50.0
+
+    @classmethod
+    def from_prices(cls, prices):
+        """由价格序列构造（只保留最后 WINDOW 个）"""
+        stats = cls()
+        for p in prices[-cls.WINDOW:]:
+            stats.append(float(p))
+        return stats
+
+    def append(self, price):
+        stats_push(self.buf, self.diffs, self.acc, self.cnt, price)
+
+    @property
+    def rsi(self):
+        return self.acc[ACC_RSI]
+
+    @property
+    def std(self):
+        return self.acc[ACC_STD]
+
+    def __len__(self):
+        return int(self.cnt[CNT_FILLED])
+
+
+class OFIState:
+    """
+    OFI 计算所需的上一帧盘口（在线推理用）。
+    数组由特征内核原地更新为当前帧，调用方只需在每个 tick 传入同一个对象。
+    """
+    __slots__ = ('asks', 'bids', 'ready')
+
+    def __init__(self, levels=config.OFI_LEVELS):
+        self.asks = np.zeros((levels, 2), dtype=np.float64)  # [价格, 数量]
+        self.bids = np.zeros((levels, 2), dtype=np.float64)
+        self.ready = False  # 是否已有上一帧
+
 
 class FeatureEngine:
     @staticmethod
     def _safe_div(a, b):
         return np.divide(a, b, out=np.zeros_like(a), where=b!=0)
 
+    @staticmethod
+    def _trade_flow(sz, side):
+        """
+        成交流：sign(side) * log1p(|sz|)，与实时内核中的标量公式一致。
+        在 |sz| 的新数组上原地完成 log1p 和乘方向，只产生一个临时数组。
+        """
+        flow = np.abs(sz)
+        np.log1p(flow, out=flow)
+        flow *= np.sign(side)
+        return flow
+
+    @staticmethod
+    def _order_flow_imbalance(ap, av, bp, bv):
+        """
+        多档 OFI（向量化）。逐档与上一行比较价格：
+        - 买盘：价格上移取当前量，不变取量差，下移取上一行量的相反数
+        - 卖盘：价格下移取当前量，不变取量差，上移取上一行量的相反数
+        OFI = 买盘流 - 卖盘流，每行按 L∞ 范数归一化；首行没有上一帧，记 0。
+
+        Args:
+            ap / av / bp / bv: (N, levels) 卖价 / 卖量 / 买价 / 买量
+
+        Returns:
+            np.ndarray: (N, levels) float64
+        """
+        ofi = np.zeros_like(av)
+        cap, pap, cav, pav = ap[1:], ap[:-1], av[1:], av[:-1]
+        cbp, pbp, cbv, pbv = bp[1:], bp[:-1], bv[1:], bv[:-1]
+        a_of = np.where(cap < pap, cav, np.where(cap == pap, cav - pav, -pav))
+        b_of = np.where(cbp > pbp, cbv, np.where(cbp == pbp, cbv - pbv, -pbv))
+        np.subtract(b_of, a_of, out=ofi[1:])
+        norm = np.abs(ofi).max(axis=1, keepdims=True)
+        np.divide(ofi, norm, out=ofi, where=norm > 0)
+        return ofi
+
     # -------------------------------------------------------
     # 场景 A: 离线训练
     # -------------------------------------------------------
     @staticmethod
-    def calculate_train_features(df):
-        mid_price = (df['ap0'] + df['bp0']) / 2
-        
+    def _row_features_numpy(raw, out):
+        """
+        逐行特征的 numpy 版本（numba 不可用时使用），与 _kernels.train_row_features 结果一致。
+        写入 out 中除 rsi_14 / volatility 以外的列。
+        """
+        ap, bp = raw[:, 0:5], raw[:, 5:10]
+        av, bv = raw[:, 10:15], raw[:, 15:20]
+        ap0, bp0 = ap[:, 0], bp[:, 0]
+        as0, bs0 = av[:, 0], bv[:, 0]
+        lt_sz, lt_side = raw[:, 20], raw[:, 21]
+
         # 2. Spread
-        df['spread'] = df['ap0'] - df['bp0']
+        out[:, 0] = ap0 - bp0
         
         # 3. Order Book Imbalance
-        df['imbalance_l1'] = FeatureEngine._safe_div(
-            (df['bs0'] - df['as0']), (df['bs0'] + df['as0'])
-        )
-        total_bid = df[['bs0','bs1','bs2','bs3','bs4']].sum(axis=1)
-        total_ask = df[['as0','as1','as2','as3','as4']].sum(axis=1)
-        df['imbalance_l5'] = FeatureEngine._safe_div((total_bid - total_ask), (total_bid + total_ask))
-
-        # 4. 技术指标
-        delta = mid_price.diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ma_up = up.rolling(window=14).mean()
-        ma_down = down.rolling(window=14).mean()
-        rsi = 100 - (100 / (1 + FeatureEngine._safe_div(ma_up, ma_down)))
-        df['rsi_14'] = rsi.fillna(50)
+        # 分子是临时数组，原地作为输出；分母为 0 时两侧挂单量均为 0，差值本身即为 0
+        imbalance_l1 = bs0 - as0
+        total_l1 = bs0 + as0
+        np.divide(imbalance_l1, total_l1, out=imbalance_l1, where=total_l1 != 0)
+        out[:, 1] = imbalance_l1
+        # 5 档挂单量直接在列块上求和
+        total_ask = av.sum(axis=1)
+        total_bid = bv.sum(axis=1)
+        total = total_bid + total_ask
+        imbalance_l5 = total_bid - total_ask
+        np.divide(imbalance_l5, total, out=imbalance_l5, where=total != 0)
+        out[:, 2] = imbalance_l5
 
-        df['volatility'] = mid_price.rolling(window=20).std().fillna(0)
+        # 6. 原始量 [修改点 4] 取对数
+        out[:, 3] = np.log1p(as0)
+        out[:, 4] = np.log1p(bs0)
 
         # 5. Trade Flow
         # [修改点 3] 对量取对数，但保留方向 (log1p 是 log(x+1) 防止报错)
         # 注意：因为 trade_flow 有正负，所以先取绝对值log，再乘回符号
-        df['trade_flow'] = np.log1p(df['lt_sz']) * df['lt_side']
-        
-        # 6. 原始量 [修改点 4] 取对数
-        df['ask_sz_0'] = np.log1p(df['as0'])
-        df['bid_sz_0'] = np.log1p(df['bs0'])
+        out[:, 7] = FeatureEngine._trade_flow(lt_sz, lt_side)
+
+        # 7. 多档 OFI
+        out[:, 8:] = FeatureEngine._order_flow_imbalance(ap, av, bp, bv)
+
+    @staticmethod
+    def calculate_train_features(df):
+        # 原始列一次性取成 (N, 22) float64 块；Fortran 序保证每一列连续，
+        # 之后所有特征都在 ndarray 上计算，不再逐列写回 df
+        raw = np.asfortranarray(df[RAW_COLUMNS].to_numpy(dtype=np.float64))
+
+        # 各列直接写入一个 (N, F) float32 输出块（与 ONNX 推理输入精度一致）。
+        # Fortran 序：每列连续，DataFrame 可以零拷贝包装（pandas 按列存储）
+        out = np.empty((len(df), len(config.FEATURES)), dtype=np.float32, order='F')
+
+        # 逐行特征互不依赖：numba 可用时按行并行计算，否则走 numpy 向量化
+        if NUMBA_AVAILABLE:
+            train_row_features(raw, out)
+        else:
+            FeatureEngine._row_features_numpy(raw, out)
 
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-        df.fillna(0, inplace=True)
+        # 4. 技术指标（滚动窗口有前后依赖，单独串行计算）
+        mid_price = (raw[:, 0] + raw[:, 5]) / 2
+        delta = np.empty_like(mid_price)
+        delta[:1] = np.nan
+        np.subtract(mid_price[1:], mid_price[:-1], out=delta[1:])
+        up = np.clip(delta, 0, None)
+        down = -np.clip(delta, None, 0)
+        # 连续 float64 数组直接交给滚动窗口内核，不构造中间 Series
+        ma_up = rolling_mean(up, 14)
+        ma_down = rolling_mean(down, 14)
+        rsi = 100 - (100 / (1 + FeatureEngine._safe_div(ma_up, ma_down)))
+        rsi[np.isnan(rsi)] = 50.0
+        out[:, 5] = rsi
+        out[:, 6] = rolling_std(mid_price, 20)
+
+        # 清洗：对输出块一次性把 NaN / Inf 置 0
+        np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
         
-        return df[config.FEATURES]
+        return pd.DataFrame(out, index=df.index, columns=config.FEATURES, copy=False)
 
     # -------------------------------------------------------
     # 场景 B: 在线推理
     # -------------------------------------------------------
     @staticmethod
-    def calculate_realtime_features(snapshot, history_prices):
+    def calculate_realtime_features(snapshot, history_prices, ofi_state, out=None):
+        """
+        在线推理特征计算，逻辑与离线训练保持一致。
+
+        Args:
+            snapshot (dict): 最新 tick 快照 {'asks': [[px, sz, ...], ...], 'bids': [...], 'lt_sz': ..., 'lt_side': ...}
+            history_prices (StreamingStats | list): 最近的中间价。传入 StreamingStats 时直接读取其增量统计；
+                             传入列表时取最后 20 个现算
+            ofi_state (OFIState): 上一帧盘口，每个 tick 传入同一个对象，调用后更新为当前帧
+            out: 可选的 (1, n_features) float32 缓冲，传入时原地写入并返回它，避免每 tick 分配
+
+        Returns:
+            np.array: (1, n_features) float32 特征向量；数据异常时返回 None
+        """
         try:
-            ap0 = float(snapshot['asks'][0][0])
-            as0 = float(snapshot['asks'][0][1])
-            bp0 = float(snapshot['bids'][0][0])
-            bs0 = float(snapshot['bids'][0][1])
-            
-            # 1. Spread
-            spread = ap0 - bp0
-            
-            # 2. Imbalance
-            imbalance_l1 = (bs0 - as0) / (bs0 + as0) if (bs0 + as0) > 0 else 0.0
-            
-            sum_as = sum([float(x[1]) for x in snapshot['asks']])
-            sum_bs = sum([float(x[1]) for x in snapshot['bids']])
-            imbalance_l5 = (sum_bs - sum_as) / (sum_bs + sum_as) if (sum_bs + sum_as) > 0 else 0.0
-            
-            # 3. RSI / Volatility
-            rsi = 50.0
-            volatility = 0.0
-            if len(history_prices) >= 20:
-                prices = np.array(history_prices, dtype=np.float64)
-                volatility = np.std(prices[-20:])
-                deltas = np.diff(prices[-15:])
-                gains = deltas[deltas > 0].sum()
-                losses = -deltas[deltas < 0].sum()
-                if losses == 0:
-                    rsi = 100.0 if gains > 0 else 50.0
-                else:
-                    rs = gains / losses
-                    rsi = 100 - (100 / (1 + rs))
-            
-            # 4. Trade Flow & Volumes [修改点 5] 实时计算也要取对数，保持一致
+            # 在调用方完成解包，内核只接收定长数组和标量
+            asks = np.asarray(snapshot['asks'], dtype=np.float64)
+            bids = np.asarray(snapshot['bids'], dtype=np.float64)
+            stats = history_prices
+            if not isinstance(stats, StreamingStats):
+                stats = StreamingStats.from_prices(history_prices)
             lt_sz = float(snapshot.get('lt_sz', 0))
             lt_side = float(snapshot.get('lt_side', 0))
-            
-            trade_flow = np.log1p(lt_sz) * lt_side # Log处理
-            
-            ask_sz_log = np.log1p(as0) # Log处理
-            bid_sz_log = np.log1p(bs0) # Log处理
-
-            # 组装
-            features = np.array([[
-                spread, imbalance_l1, imbalance_l5, 
-                ask_sz_log, bid_sz_log, rsi, volatility, trade_flow
-            ]], dtype=np.float32)
-            
-            if np.isnan(features).any(): return None
+
+            features = out if out is not None else np.empty((1, len(config.FEATURES)), dtype=np.float32)
+            ok = realtime_features(asks, bids, ofi_state.asks, ofi_state.bids, ofi_state.ready,
+                                   stats.rsi, stats.std, lt_sz, lt_side, features[0])
+            ofi_state.ready = True
+            if not ok:
+                return None
             return features
             
         except Exception as e:
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def update_realtime(asks, bids, stats, ofi_state, lt_sz, lt_side, out):
+        """
+        在线推理热路径：一次内核调用完成 中间价推入增量统计 -> OFI / 特征计算。
+        与 stats.append(mid) + calculate_realtime_features(...) 等价，但全程不回到解释器。
+
+        Args:
+            asks / bids: 盘口数组 np.asarray(res['asks'], dtype=np.float64)，每行 [价格, 数量, ...]
+            stats (StreamingStats): 中间价增量统计，原地更新
+            ofi_state (OFIState): 上一帧盘口，特征计算后原地更新
+            lt_sz / lt_side: 最新成交量 / 方向
+            out: (1, n_features) float32 输出缓冲
+
+        Returns:
+            (有效点数, bool)：点数不足 StreamingStats.WINDOW 时不计算特征；特征含 NaN 时为 False
+        """
+        n, ok = realtime_update(asks, bids, stats.buf, stats.diffs, stats.acc, stats.cnt,
+                                ofi_state.asks, ofi_state.bids, ofi_state.ready,
+                                float(lt_sz), float(lt_side), out[0])
+        if n >= StreamingStats.WINDOW:
+            ofi_state.ready = True
+        return n, ok
+
@@ -0,0 +1,84 @@
+# predictor.py
+"""
+在线推理预测器
+
+- 优先使用 lleaves 把 LightGBM 文本模型编译为本地代码（LLVM），单样本预测没有图调度和张量分配开销。
+- lleaves 未安装、文本模型不存在或 config.USE_ONNX = True 时，回退 ONNX Runtime。
+
+load_predictor 返回 predict(features) -> 买入 (标签 1) 概率，features 为 (1, n_features) float32。
+"""
+import os
+import config
+
+try:
+    import lleaves
+    LLEAVES_AVAILABLE = True
+except ImportError:  # lleaves 为可选依赖
+    LLEAVES_AVAILABLE = False
+
+
+def _load_lleaves(tag):
+    """编译 LightGBM 文本模型；编译结果缓存为 .so，训练时会删除旧缓存"""
+    booster_path = os.path.join(config.MODEL_DIR, config.BOOSTER_NAME)
+    if not os.path.exists(booster_path):
+        return None
+
+    print(f"🧠 [{tag}] 加载模型 (lleaves 本地代码): {config.BOOSTER_NAME}")
+    model = lleaves.Model(model_file=booster_path)
+    model.compile(cache=os.path.join(config.MODEL_DIR, config.COMPILED_NAME))
+
+    def predict(features):
+        # 单样本不开线程池；binary 目标下输出即为标签 1 的概率
+        return float(model.predict(features, n_jobs=1)[0])
+
+    return predict
+
+
+def _load_onnx(tag):
+    """ONNX Runtime 会话"""
+    import onnxruntime as ort
+
+    model_path = os.path.join(config.MODEL_DIR, config.MODEL_NAME)
+    if not os.path.exists(model_path):
+        return None
+
+    print(f"🧠 [{tag}] 加载模型 (ONNX Runtime): {config.MODEL_NAME}")
+    # 单样本推理：全量图优化，单线程避免线程池调度开销
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = 1
+    session = ort.InferenceSession(model_path, sess_options, providers=['CPUExecutionProvider'])
+
+    # 获取输入输出节点名称；LGBM 输出通常是 [label, probabilities]
+    input_name = session.get_inputs()[0].name
+    output_names = [session.get_outputs()[1].name]
+
+    def predict(features):
+        # 输出是 list of dicts: [{0: 0.9, 1: 0.1}]
+        return session.run(output_names, {input_name: features})[0][0].get(1, 0.0)
+
+    return predict
+
+
+def load_predictor(tag):
+    """
+    加载预测器。
+
+    Args:
+        tag: 日志前缀 (如 "Inference" / "Simulation")
+
+    Returns:
+        predict(features) -> float；找不到任何模型文件时返回 None
+    """
+    predict = None
+    if LLEAVES_AVAILABLE and not config.USE_ONNX:
+        try:
+            predict = _load_lleaves(tag)
+        except Exception as e:
+            print(f"⚠️ [{tag}] lleaves 编译失败，回退 ONNX Runtime: {e}")
+    if predict is None:
+        predict = _load_onnx(tag)
+    if predict is None:
+        print(f"❌ 未找到模型文件: {config.MODEL_DIR}")
+        print("请先运行 train_pipeline.py 生成模型。")
+    return predict
@@ -1,44 +1,43 @@
 # run_inference.py
 import asyncio
-import websockets
+from websockets.asyncio.client import connect
 import json
-import os
 import numpy as np
-import onnxruntime as ort
-from collections import deque
 import config
-from feature_engine import FeatureEngine
+from feature_engine import FeatureEngine, OFIState, StreamingStats
+from predictor import load_predictor
+
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+    dumps = json.dumps
 
 # 历史价格队列 (用于计算 RSI, Volatility)
-price_history = deque(maxlen=100)
+price_history = StreamingStats()
+# 上一帧盘口 (用于计算 OFI)
+ofi_state = OFIState()
+# 观望状态每 20 次推理打印一次
+IDLE_LOG_EVERY = 20
 # 成交信息缓存
 last_trade = {"px": 0.0, "sz": 0.0, "side": 0}
 
-def load_model():
-    model_path = os.path.join(config.MODEL_DIR, config.MODEL_NAME)
-    if not os.path.exists(model_path):
-        print(f"❌ 未找到模型文件: {model_path}")
-        print("请先运行 train_pipeline.py 生成模型。")
-        return None
-    
-    print(f"🧠 [Inference] 加载模型: {config.MODEL_NAME}")
-    # 创建推理会话
-    session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
-    return session
-
 async def inference_loop():
-    session = load_model()
-    if session is None: return
+    predict = load_predictor("Inference")
+    if predict is None: return
 
-    # 获取输入输出节点名称
-    input_name = session.get_inputs()[0].name
-    output_name = session.get_outputs()[1].name # LGBM输出通常是 [label, probabilities]
+    # 输入缓冲只创建一次，每个 tick 原地覆写特征
+    in_buf = np.empty((1, len(config.FEATURES)), dtype=np.float32)
+    # 观望日志计数器：每 IDLE_LOG_EVERY 次推理打印一次
+    idle_ticks = 0
     
     uri = "wss://ws.okx.com:8443/ws/v5/public"
     
     print(f"🔥 [Inference] 连接行情: {config.SYMBOL}")
     
-    async with websockets.connect(uri) as ws:
+    async with connect(uri) as ws:
         # 订阅
         sub_msg = {
             "op": "subscribe",
@@ -47,12 +46,13 @@ async def inference_loop():
                 {"channel": "trades", "instId": config.SYMBOL}
             ]
         }
-        await ws.send(json.dumps(sub_msg))
+        await ws.send(dumps(sub_msg))
 
         while True:
             try:
-                msg = await ws.recv()
-                data = json.loads(msg)
+                # 不做 UTF-8 解码，原始 bytes 直接交给 JSON 解析
+                msg = await ws.recv(decode=False)
+                data = loads(msg)
                 
                 if 'data' not in data: continue
                 channel = data['arg']['channel']
@@ -66,50 +66,41 @@ async def inference_loop():
                 
                 # 2. 收到盘口 -> 触发推理
                 elif channel == 'books5':
-                    # 构造 Snapshot
-                    snapshot = {
-                        'asks': res['asks'], # 原始字符串 list
-                        'bids': res['bids'],
-                        'lt_px': last_trade['px'],
-                        'lt_sz': last_trade['sz'],
-                        'lt_side': last_trade['side']
-                    }
+                    # 原始字符串盘口一次性转为数组，之后的数值计算全部在内核中完成
+                    asks = np.asarray(res['asks'], dtype=np.float64)
+                    bids = np.asarray(res['bids'], dtype=np.float64)
+                    mid_price = (asks[0, 0] + bids[0, 0]) / 2
                     
-                    # 维护历史价格 (用于计算指标)
-                    mid_price = (float(res['asks'][0][0]) + float(res['bids'][0][0])) / 2
-                    price_history.append(mid_price)
+                    # 维护历史价格 (用于计算指标) 并计算特征，写入 in_buf
+                    n, ok = FeatureEngine.update_realtime(
+                        asks, bids, price_history, ofi_state,
+                        last_trade['sz'], last_trade['side'], in_buf
+                    )
                     
                     # 至少需要 20 个点才能算特征
-                    if len(price_history) < 20:
-                        if len(price_history) % 5 == 0:
-                            print(f"⏳ 初始化中... ({len(price_history)}/20)")
+                    if n < 20:
+                        if n % 5 == 0:
+                            print(f"⏳ 初始化中... ({n}/20)")
                         continue
-
-                    # 计算特征
-                    features = FeatureEngine.calculate_realtime_features(
-                        snapshot, list(price_history)
-                    )
                     
-                    if features is None: continue
+                    if not ok: continue
+                    features = in_buf
                     
                     # DEBUG: Print features
                     # print(f"DEBUG Features: {features}")
 
-                    # ONNX 推理
-                    # 输入形状必须是 (1, N_Features)
-                    pred_onx = session.run([output_name], {input_name: features})
-                    
-                    # 解析结果
-                    # pred_onx[0] 是一个 list of dicts: [{0: 0.9, 1: 0.1}]
-                    probs = pred_onx[0][0]
-                    buy_prob = probs.get(1, 0.0) # 获取标签为1的概率
+                    # 推理 (lleaves 本地代码或 ONNX Runtime)
+                    # 输入形状必须是 (1, N_Features)，返回标签为1的概率
+                    buy_prob = predict(features)
                     
                     # 打印高置信度信号
                     if buy_prob > 0.5: # 仅展示 > 50% 的
                         print(f"🚀 信号触发 | 概率: {buy_prob:.4f} | 价格: {mid_price:.2f}")
                     else:
-                        # 仅为了展示存活，偶尔打印
-                        if np.random.random() < 0.05:
+                        # 仅为了展示存活，偶尔打印（计数节流，不在热循环里调随机数）
+                        idle_ticks += 1
+                        if idle_ticks >= IDLE_LOG_EVERY:
+                            idle_ticks = 0
                             print(f"💤 观望中... | 概率: {buy_prob:.4f}________________________价格: {mid_price:.2f}")
 
             except Exception as e:
@@ -1,15 +1,21 @@
 # run_simulation.py
 import asyncio
-import websockets
+from websockets.asyncio.client import connect
 import json
-import os
 import time
 import numpy as np
-import onnxruntime as ort
-from collections import deque
 from datetime import datetime
 import config
-from feature_engine import FeatureEngine
+from feature_engine import FeatureEngine, OFIState, StreamingStats
+from predictor import load_predictor
+
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+    dumps = json.dumps
 
 # --- 模拟账户配置 ---
 INITIAL_CAPITAL = 10000.0  # 初始资金
@@ -19,6 +25,7 @@ BUY_THRESHOLD = 0.5
 TP_PERCENT = 0.002         # 止盈 0.2%
 SL_PERCENT = -0.001        # 止损 -0.1%
 MAX_HOLD_SEC = 30          # 最长持仓时间(秒)
+IDLE_LOG_EVERY = 50        # 空仓监控日志每 50 次推理打印一次
 
 class SimAccount:
     def __init__(self, initial_usdt):
@@ -76,29 +83,26 @@ class SimAccount:
 
 # --- 核心逻辑 ---
 
-price_history = deque(maxlen=100)
+price_history = StreamingStats()
+# 上一帧盘口 (用于计算 OFI)
+ofi_state = OFIState()
 last_trade = {"px": 0.0, "sz": 0.0, "side": 0}
 account = SimAccount(INITIAL_CAPITAL)
 
-def load_model():
-    model_path = os.path.join(config.MODEL_DIR, config.MODEL_NAME)
-    if not os.path.exists(model_path):
-        print(f"❌ 未找到模型: {model_path}")
-        return None
-    return ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
-
 async def simulation_loop():
-    session = load_model()
-    if session is None: return
+    predict = load_predictor("Simulation")
+    if predict is None: return
     
-    input_name = session.get_inputs()[0].name
-    output_name = session.get_outputs()[1].name
+    # 输入缓冲只创建一次，每个 tick 原地覆写特征
+    in_buf = np.empty((1, len(config.FEATURES)), dtype=np.float32)
+    # 监控日志计数器：每 IDLE_LOG_EVERY 次推理打印一次
+    idle_ticks = 0
     
     uri = "wss://ws.okx.com:8443/ws/v5/public"
     print(f"🎰 [Simulation] 启动模拟盘 | 初始资金: {INITIAL_CAPITAL} USDT")
     print(f"📝 策略: 信号>{BUY_THRESHOLD}买入 | 止盈{TP_PERCENT*100}% | 止损{SL_PERCENT*100}%")
     
-    async with websockets.connect(uri) as ws:
+    async with connect(uri) as ws:
         sub_msg = {
             "op": "subscribe",
             "args": [
@@ -106,14 +110,15 @@ async def simulation_loop():
                 {"channel": "trades", "instId": config.SYMBOL}
             ]
         }
-        await ws.send(json.dumps(sub_msg))
+        await ws.send(dumps(sub_msg))
 
         last_print_time = time.time()
 
         while True:
             try:
-                msg = await ws.recv()
-                data = json.loads(msg)
+                # 不做 UTF-8 解码，原始 bytes 直接交给 JSON 解析
+                msg = await ws.recv(decode=False)
+                data = loads(msg)
                 if 'data' not in data: continue
                 
                 channel = data['arg']['channel']
@@ -127,9 +132,12 @@ async def simulation_loop():
                 
                 # 2. 盘口数据 -> 驱动策略
                 elif channel == 'books5':
+                    # 原始字符串盘口一次性转为数组，之后的数值计算全部在内核中完成
+                    asks = np.asarray(res['asks'], dtype=np.float64)
+                    bids = np.asarray(res['bids'], dtype=np.float64)
                     # 获取买一卖一价 (真实交易要看盘口)
-                    ask_price = float(res['asks'][0][0]) # 买入看这里
-                    bid_price = float(res['bids'][0][0]) # 卖出看这里
+                    ask_price = float(asks[0, 0]) # 买入看这里
+                    bid_price = float(bids[0, 0]) # 卖出看这里
                     mid_price = (ask_price + bid_price) / 2
                     
                     current_time = time.time()
@@ -154,27 +162,25 @@ async def simulation_loop():
                             print(f"⏳ 持仓中... 浮盈: {pct_change*100:.3f}% | 价格: {mid_price:.2f}", end="\r")
                             last_print_time = current_time
                         
+                        # 持仓期间不计算特征，上一帧盘口作废，平仓后首帧 OFI 记 0
+                        ofi_state.ready = False
                         continue # 持仓时不进行买入预测
 
                     # --- B. 买入预测 (如果空仓) ---
                     
-                    # 维护历史数据
-                    price_history.append(mid_price)
-                    if len(price_history) < 20:
-                        if len(price_history) % 5 == 0: print(f"⏳ 预热数据... {len(price_history)}/20")
+                    # 维护历史数据并构造特征 (一次内核调用，写入 in_buf)
+                    n, ok = FeatureEngine.update_realtime(
+                        asks, bids, price_history, ofi_state,
+                        last_trade['sz'], last_trade['side'], in_buf
+                    )
+                    if n < 20:
+                        if n % 5 == 0: print(f"⏳ 预热数据... {n}/20")
                         continue
-
-                    # 构造特征
-                    snapshot = {
-                        'asks': res['asks'], 'bids': res['bids'],
-                        'lt_px': last_trade['px'], 'lt_sz': last_trade['sz'], 'lt_side': last_trade['side']
-                    }
-                    features = FeatureEngine.calculate_realtime_features(snapshot, list(price_history))
-                    if features is None: continue
+                    if not ok: continue
+                    features = in_buf
 
                     # 推理
-                    pred_onx = session.run([output_name], {input_name: features})
-                    buy_prob = pred_onx[0][0].get(1, 0.0)
+                    buy_prob = predict(features)
 
                     # 策略判定
                     if buy_prob > BUY_THRESHOLD:
@@ -182,8 +188,10 @@ async def simulation_loop():
                         print(f"🚀 信号触发! 概率: {buy_prob:.4f}")
                         account.buy(ask_price, current_time)
                     else:
-                        # 偶尔打印状态
-                        if np.random.random() < 0.02:
+                        # 偶尔打印状态（计数节流，不在热循环里调随机数）
+                        idle_ticks += 1
+                        if idle_ticks >= IDLE_LOG_EVERY:
+                            idle_ticks = 0
                             nav = account.get_balance(mid_price)
                             pnl_total = (nav - INITIAL_CAPITAL)
                             color = "🟢" if pnl_total >= 0 else "🔴"
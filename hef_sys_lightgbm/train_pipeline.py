@@ -7,24 +7,54 @@ import glob
 from onnxmltools import convert_lightgbm
 from onnxconverter_common.data_types import FloatTensorType
 import config
-from feature_engine import FeatureEngine
+from feature_engine import FeatureEngine, RAW_COLUMNS
+
+# 只解析特征和标签用到的列，并显式给出类型，跳过 pandas 的类型推断。
+# 价格保留 float64：float32 在 BTC 价位上只有 ~0.008 的分辨率，会把价差/中间价差分及 OFI 的价格比较量化掉；
+# 挂单量、成交量用 float32 足够，成交方向为 ±1/0
+CSV_DTYPES = {c: (np.float64 if c.startswith(('ap', 'bp')) else np.float32) for c in RAW_COLUMNS}
+CSV_DTYPES['lt_side'] = np.int8
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow 为可选依赖，缺失时只读 CSV
+    PYARROW_AVAILABLE = False
+
+
+def _file_day(path):
+    """从文件名 {SYMBOL}_{YYYYMMDD}[_{HHMMSS}].{csv|parquet} 中取日期"""
+    return os.path.basename(path)[len(config.SYMBOL) + 1:][:8]
+
+
+def _read_file(path):
+    """读取单个数据文件：Parquet 直接按列读出（类型已在写入时确定），CSV 按 CSV_DTYPES 解析"""
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=RAW_COLUMNS).to_pandas()
+    # 简单检查文件是否为空
+    if os.path.getsize(path) < 100:
+        return None
+    return pd.read_csv(path, usecols=RAW_COLUMNS, dtype=CSV_DTYPES, engine='c')
 
 def load_recent_data(days=5):
-    """加载最近 N 天的数据"""
-    files = sorted(glob.glob(os.path.join(config.DATA_DIR, "*.csv")))
+    """加载最近 N 天的数据（Parquet 与旧的 CSV 文件都可读取）"""
+    patterns = ["*.csv", "*.parquet"] if PYARROW_AVAILABLE else ["*.csv"]
+    files = sorted(f for p in patterns for f in glob.glob(os.path.join(config.DATA_DIR, p)))
     if not files:
         print("⚠️ 未找到数据文件！请先运行 data_collector.py 录制几分钟数据。")
         return None
     
-    recent_files = files[-days:]
+    # 同一天可能有多个 Parquet 文件（每次启动一个），按日期取最近 N 天
+    recent_days = sorted({_file_day(f) for f in files})[-days:]
+    recent_files = [f for f in files if _file_day(f) in recent_days]
     print(f"📚 [Train] 加载文件: {[os.path.basename(f) for f in recent_files]}")
     
     df_list = []
     for f in recent_files:
         try:
-            # 简单检查文件是否为空
-            if os.path.getsize(f) < 100: continue
-            df_list.append(pd.read_csv(f))
+            df = _read_file(f)
+            if df is not None:
+                df_list.append(df)
         except Exception as e:
             print(f"⚠️ 跳过损坏文件 {f}: {e}")
             
@@ -43,17 +73,23 @@ def train_model():
     X = FeatureEngine.calculate_train_features(df)
     
     # 3. 打标签
-    # 计算未来价格变化率
-    mid_price = (df['ap0'] + df['bp0']) / 2
-    future_return = mid_price.shift(-config.PREDICT_HORIZON) / mid_price - 1
+    # 计算未来价格变化率（全程 ndarray，未来价用切片平移代替 Series.shift）
+    h = config.PREDICT_HORIZON
+    mid_price = (df['ap0'].to_numpy(dtype=np.float64) + df['bp0'].to_numpy(dtype=np.float64)) * 0.5
+    future_mid = np.full_like(mid_price, np.nan)
+    if h < len(mid_price):
+        future_mid[:-h] = mid_price[h:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        future_return = future_mid / mid_price - 1
     
-    # Label: 1 = 涨幅超过阈值, 0 = 其他
-    y = np.zeros(len(df))
-    y[future_return > config.LABEL_THRESHOLD] = 1
+    # Label: 1 = 涨幅超过阈值, 0 = 其他 (int8 标签)
+    y = (future_return > config.LABEL_THRESHOLD).astype(np.int8)
     
-    # 清洗无效数据 (NaN)
-    valid_idx = ~np.isnan(future_return) & ~X.isnull().any(axis=1)
-    X = X[valid_idx]
+    # 清洗无效数据：特征在 calculate_train_features 中已清洗为有限值，这里只需过滤收益率
+    # 特征以 float32 ndarray 交给模型，与 ONNX 推理时的输入精度一致，也省去 pandas 的列类型推断
+    # (calculate_train_features 已输出 float32，to_numpy 不再复制)
+    valid_idx = np.isfinite(future_return)
+    X = X.to_numpy(dtype=np.float32, copy=False)[valid_idx]
     y = y[valid_idx]
     
     pos_ratio = np.mean(y==1)
@@ -97,5 +133,14 @@ def train_model():
         
     print(f"✅ [Train] 模型已保存: {save_path}")
 
+    # 6. 导出 LightGBM 文本模型，供 lleaves 编译为本地代码
+    booster_path = os.path.join(config.MODEL_DIR, config.BOOSTER_NAME)
+    model.booster_.save_model(booster_path)
+    # 删除旧的编译缓存，推理端下次启动时按新模型重新编译
+    compiled_path = os.path.join(config.MODEL_DIR, config.COMPILED_NAME)
+    if os.path.exists(compiled_path):
+        os.remove(compiled_path)
+    print(f"✅ [Train] 文本模型已保存: {booster_path}")
+
 if __name__ == "__main__":
     train_model()
\ No newline at end of file
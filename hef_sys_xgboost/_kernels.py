@@ -0,0 +1,211 @@
+# _kernels.py
+"""
+特征计算内核
+
+- rolling_mean / rolling_std: 离线训练用的滚动窗口。语义与 pandas rolling(window).mean()/std()
+  一致：前 window-1 个位置以及窗口内含 NaN 的位置输出 NaN，std 使用样本标准差 (ddof=1)。
+- realtime_features: 在线实盘单 tick 特征向量，输入为定长数组，结果写入调用方预分配的缓冲区。
+- train_row_features: 离线训练的逐行特征（价差、失衡、挂单量、成交流），行间无依赖，
+  numba 可用时以 parallel=True 按行多核并行；不可用时由 feature_engine 走 numpy 向量化实现。
+
+numba 可用时以 nopython 模式编译（cache=True 落盘，跨进程复用编译结果），
+否则滚动窗口回退为 numpy 滑动窗口实现，实盘内核以纯 Python 执行同一份代码。
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba 为可选依赖
+    NUMBA_AVAILABLE = False
+    prange = range
+
+
+def _rolling_mean_numpy(x: np.ndarray, window: int) -> np.ndarray:
+    """numpy 版本：滚动均值"""
+    out = np.full(x.shape[0], np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def _rolling_std_numpy(x: np.ndarray, window: int) -> np.ndarray:
+    """numpy 版本：滚动样本标准差"""
+    out = np.full(x.shape[0], np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window).std(axis=1, ddof=1)
+    return out
+
+
+def _realtime_features_py(asks, bids, history, head, count, lt_sz, lt_side, out):
+    """
+    单 tick 实盘特征，按 config.FEATURES 顺序写入 out。
+
+    Args:
+        asks / bids: (5, >=2) float64 数组，每行 [价格, 数量, ...]
+        history: 中间价环形缓冲 (float64)，head 为下一个写入位置，count 为有效点数
+        out: (8,) float32 输出缓冲
+
+    Returns:
+        bool: 特征中不含 NaN 时为 True
+    """
+    ap0 = asks[0, 0]
+    as0 = asks[0, 1]
+    bp0 = bids[0, 0]
+    bs0 = bids[0, 1]
+
+    # 1. Spread
+    spread = ap0 - bp0
+
+    # 2. Imbalance L1
+    s1 = bs0 + as0
+    imbalance_l1 = (bs0 - as0) / s1 if s1 > 0 else 0.0
+
+    # 3. Imbalance L5
+    sum_as = 0.0
+    sum_bs = 0.0
+    for k in range(asks.shape[0]):
+        sum_as += asks[k, 1]
+    for k in range(bids.shape[0]):
+        sum_bs += bids[k, 1]
+    s5 = sum_bs + sum_as
+    imbalance_l5 = (sum_bs - sum_as) / s5 if s5 > 0 else 0.0
+
+    # 4. 历史序列指标：最近 20 点的总体标准差；最近 15 点（14 个差分）的涨跌累加 RSI
+    rsi = 50.0
+    volatility = 0.0
+    if count >= 20:
+        cap = history.shape[0]
+        start = (head - 20) % cap  # 最近 20 点中最早一个的位置
+        mean = 0.0
+        for k in range(20):
+            idx = start + k
+            if idx >= cap:
+                idx -= cap
+            mean += history[idx]
+        mean /= 20
+        var = 0.0
+        gains = 0.0
+        losses = 0.0
+        prev = 0.0
+        for k in range(20):
+            idx = start + k
+            if idx >= cap:
+                idx -= cap
+            v = history[idx]
+            d = v - mean
+            var += d * d
+            if k >= 6:
+                delta = v - prev
+                if delta > 0:
+                    gains += delta
+                elif delta < 0:
+                    losses -= delta
+            prev = v
+        volatility = np.sqrt(var / 20)
+        if losses == 0:
+            rsi = 100.0 if gains > 0 else 50.0
+        else:
+            rsi = 100 - (100 / (1 + gains / losses))
+
+    # 5. Trade Flow
+    trade_flow = lt_sz * lt_side
+
+    out[0] = spread
+    out[1] = imbalance_l1
+    out[2] = imbalance_l5
+    out[3] = as0
+    out[4] = bs0
+    out[5] = rsi
+    out[6] = volatility
+    out[7] = trade_flow
+    for k in range(out.shape[0]):
+        if out[k] != out[k]:
+            return False
+    return True
+
+
+def _train_row_features_py(raw, out):
+    """
+    离线逐行特征，写入 out 中除 rsi_14 (5) / volatility (6) 以外的列，列顺序同 config.FEATURES。
+
+    Args:
+        raw: (N, 14) float64，列顺序同 feature_engine.RAW_COLUMNS
+             (ap0, bp0, as0-4, bs0-4, lt_sz, lt_side)
+        out: (N, 8) float32 输出块
+    """
+    n = raw.shape[0]
+    for i in prange(n):
+        as0 = raw[i, 2]
+        bs0 = raw[i, 7]
+
+        # Spread / Imbalance：分母为 0 时记 0（与 numpy 版本一致）
+        out[i, 0] = raw[i, 0] - raw[i, 1]
+        s1 = bs0 + as0
+        out[i, 1] = (bs0 - as0) / s1 if s1 != 0 else 0.0
+        sum_as = 0.0
+        sum_bs = 0.0
+        for k in range(5):
+            sum_as += raw[i, 2 + k]
+            sum_bs += raw[i, 7 + k]
+        s5 = sum_bs + sum_as
+        out[i, 2] = (sum_bs - sum_as) / s5 if s5 != 0 else 0.0
+
+        # 原始量与成交流
+        out[i, 3] = as0
+        out[i, 4] = bs0
+        out[i, 7] = raw[i, 12] * raw[i, 13]
+
+
+if NUMBA_AVAILABLE:
+    # 逐行特征：按行并行（numba 按线程自动分块）；不开 fastmath，NaN 输入照常传播到输出再统一清洗
+    train_row_features = njit(parallel=True, cache=True)(_train_row_features_py)
+    train_row_features(np.ones((2, 14), order='F'), np.empty((2, 8), dtype=np.float32, order='F'))
+
+    # 不开 fastmath：需要保留 NaN 判断。窗口很小，逐窗口两遍计算，
+    # 避免累计和/平方和在长序列上的误差累积（中间价量级大，平方和相减易失精度）
+    @njit(cache=True)
+    def rolling_mean(x, window):
+        """滚动均值，窗口内含 NaN 时输出 NaN"""
+        n = x.shape[0]
+        out = np.empty(n)
+        for i in range(min(window - 1, n)):
+            out[i] = np.nan
+        for i in range(window - 1, n):
+            s = 0.0
+            for j in range(i - window + 1, i + 1):
+                s += x[j]
+            out[i] = s / window
+        return out
+
+    @njit(cache=True)
+    def rolling_std(x, window):
+        """滚动样本标准差 (ddof=1)，窗口内含 NaN 时输出 NaN"""
+        n = x.shape[0]
+        out = np.empty(n)
+        for i in range(min(window - 1, n)):
+            out[i] = np.nan
+        for i in range(window - 1, n):
+            s = 0.0
+            for j in range(i - window + 1, i + 1):
+                s += x[j]
+            m = s / window
+            ss = 0.0
+            for j in range(i - window + 1, i + 1):
+                d = x[j] - m
+                ss += d * d
+            out[i] = np.sqrt(ss / (window - 1))
+        return out
+
+    # 导入时预热编译，避免首次计算特征时的 JIT 延迟
+    rolling_mean(np.ones(2, dtype=np.float64), 2)
+    rolling_std(np.ones(2, dtype=np.float64), 2)
+
+    realtime_features = njit(cache=True)(_realtime_features_py)
+    realtime_features(np.ones((5, 2)), np.ones((5, 2)), np.ones(20), 0, 20, 1.0, 1.0,
+                      np.empty(8, dtype=np.float32))
+else:
+    train_row_features = None  # 由 feature_engine 走 numpy 向量化实现
+    rolling_mean = _rolling_mean_numpy
+    rolling_std = _rolling_std_numpy
+    realtime_features = _realtime_features_py
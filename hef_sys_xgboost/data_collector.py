@@ -1,16 +1,73 @@
 # data_collector.py
-import asyncio
-import websockets
 import json
-import csv
+import queue
+import threading
 import time
 import os
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timedelta
+from websocket import WebSocketApp
 import config
 
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+    dumps = json.dumps
+
 # OKX Public WebSocket URL
 WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
 
+# 成交方向查表：buy=1, sell=-1，未知方向记 0
+_SIDE = {'buy': 1, 'sell': -1}
+
+# 批量写盘：1 MiB 文件缓冲，累计 FLUSH_ROWS 行或超过 FLUSH_INTERVAL 秒才 flush 一次
+FILE_BUFFER_SIZE = 1 << 20
+FLUSH_ROWS = 100
+FLUSH_INTERVAL = 1.0
+
+# 字段说明:
+# | 字段名 | 含义 | 说明 |
+# | :--- | :--- | :--- |
+# | ts_loc | 本地时间戳 | 机器接收到数据时的系统时间 (Unix Timestamp) |
+# | ts_exch | 交易所时间戳 | 交易所撮合引擎生成数据的时间 (Unix Timestamp, 毫秒) |
+# | ap0 ~ ap4 | 卖方价格 (Ask Price) | ap0 是卖一价 (最优卖出价)，ap4 是卖五价 |
+# | as0 ~ as4 | 卖方数量 (Ask Size) | 对应卖一到卖五挂单的数量 |
+# | bp0 ~ bp4 | 买方价格 (Bid Price) | bp0 是买一价 (最优买入价)，bp4 是买五价 |
+# | bs0 ~ bs4 | 买方数量 (Bid Size) | 对应买一到买五挂单的数量 |
+# | lt_px | 最新成交价 | 最近一笔成交的价格 (Last Trade Price) |
+# | lt_sz | 最新成交量 | 最近一笔成交的数量 (Last Trade Size) |
+# | lt_side | 最新成交方向 | 1: 主动买入 (Taker Buy), -1: 主动卖出 (Taker Sell)
+# 定义 CSV 表头
+HEADERS = [
+    "ts_loc", "ts_exch",
+    # Ask 1-5 (Price, Size)
+    "ap0", "as0", "ap1", "as1", "ap2", "as2", "ap3", "as3", "ap4", "as4",
+    # Bid 1-5
+    "bp0", "bs0", "bp1", "bs1", "bp2", "bs2", "bp3", "bs3", "bp4", "bs4",
+    # Trade Info
+    "lt_px", "lt_sz", "lt_side"
+]
+# 行全部是可信数值，不需要 csv 模块的引号/转义逻辑，直接按固定格式拼接。
+# 浮点用 {} (即 repr 最短往返表示)，与 csv.writer 的输出一致且不丢精度
+HEADER_LINE = ",".join(HEADERS) + "\n"
+ROW_FMT = ",".join(["{}"] * len(HEADERS)) + "\n"
+
+SUBSCRIBE_MSG = {
+    "op": "subscribe",
+    "args": [
+        {"channel": "books5", "instId": config.SYMBOL},
+        {"channel": "trades", "instId": config.SYMBOL}
+    ]
+}
+# 订阅帧只序列化一次，断线重连时直接复用
+SUBSCRIBE_FRAME = dumps(SUBSCRIBE_MSG)
+
+# 写盘线程的退出信号
+_STOP = object()
+
 # 内存缓存：记录最近一笔成交信息
 last_trade_state = {
     "px": 0.0,
@@ -18,118 +75,142 @@ last_trade_state = {
     "side": 0  # 1=Buy, -1=Sell
 }
 
-async def record_loop():
+
+def _open_csv(day):
+    """
+    打开指定日期的 CSV 文件（追加模式），新文件写入表头。
+
+    Returns:
+        (file, 次日零点的时间戳)
+    """
+    file_path = os.path.join(config.DATA_DIR, f"{config.SYMBOL}_{day.strftime('%Y%m%d')}.csv")
+    file_exists = os.path.isfile(file_path)
+    # 大块缓冲 + 定量/定时 flush，代替逐行写盘的行缓冲
+    f = open(file_path, 'a+', newline='', buffering=FILE_BUFFER_SIZE)
+    if not file_exists:
+        f.write(HEADER_LINE)
+    next_day = datetime.combine(day.date() + timedelta(days=1), datetime.min.time())
+    return f, next_day.timestamp()
+
+
+def writer_loop(rows):
+    """
+    写盘线程：消费行队列并写入 CSV。
+
+    - 按行的本地时间戳判断跨天，到零点即切换到新文件。
+    - 攒够 FLUSH_ROWS 行或距上次落盘超过 FLUSH_INTERVAL 秒时 flush。
+    - 收到 _STOP 后落盘并关闭文件。
     """
-    数据录制主循环 (异步)。
-    
+    f, rollover_ts = _open_csv(datetime.now())
+    write = f.write
+    fmt = ROW_FMT.format
+    pending_rows = 0
+    last_flush = time.time()
+    try:
+        while True:
+            try:
+                row = rows.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                row = None
+            if row is _STOP:
+                break
+
+            if row is not None:
+                # 检查是否跨天，切换文件
+                if row[0] >= rollover_ts:
+                    f.close()
+                    f, rollover_ts = _open_csv(datetime.fromtimestamp(row[0]))
+                    write = f.write
+                    pending_rows = 0
+                    print(f"📅 [Collector] 切换新文件: {datetime.fromtimestamp(row[0]).strftime('%Y%m%d')}")
+                write(fmt(*row))
+                pending_rows += 1
+
+            # 攒够行数或超过时间间隔才落盘
+            now = time.time()
+            if pending_rows and (pending_rows >= FLUSH_ROWS or now - last_flush >= FLUSH_INTERVAL):
+                f.flush()
+                pending_rows = 0
+                last_flush = now
+    finally:
+        f.close()
+
+
+def record_loop():
+    """
+    数据录制主循环。
+
     功能:
-    1. 连接 OKX 公共 WebSocket 频道。
+    1. 连接 OKX 公共 WebSocket 频道（websocket-client 同步客户端，跳过逐帧 UTF-8 校验）。
     2. 订阅 Order Book (books5) 和 Trade (trades) 频道。
     3. 实时接收推送数据：
        - 对于成交数据 (trades): 更新内存中的最新成交状态 (价格, 数量, 方向)。
-       - 对于盘口数据 (books5): 结合当前时间戳、盘口深度数据和最新成交状态，组装成一行记录写入 CSV 文件。
+       - 对于盘口数据 (books5): 结合当前时间戳、盘口深度数据和最新成交状态，组装成一行记录放入队列，
+         由独立的写盘线程写入 CSV 文件。
     4. 处理断线重连和跨天文件切换。
     """
     print(f"🚀 [Collector] 启动录制: {config.SYMBOL}")
-    
-    current_date = datetime.now().strftime('%Y%m%d')
-    file_path = os.path.join(config.DATA_DIR, f"{config.SYMBOL}_{current_date}.csv")
-    
-
-    # 字段说明:
-    # | 字段名 | 含义 | 说明 |
-    # | :--- | :--- | :--- |
-    # | ts_loc | 本地时间戳 | 机器接收到数据时的系统时间 (Unix Timestamp) |
-    # | ts_exch | 交易所时间戳 | 交易所撮合引擎生成数据的时间 (Unix Timestamp, 毫秒) |
-    # | ap0 ~ ap4 | 卖方价格 (Ask Price) | ap0 是卖一价 (最优卖出价)，ap4 是卖五价 |
-    # | as0 ~ as4 | 卖方数量 (Ask Size) | 对应卖一到卖五挂单的数量 |
-    # | bp0 ~ bp4 | 买方价格 (Bid Price) | bp0 是买一价 (最优买入价)，bp4 是买五价 |
-    # | bs0 ~ bs4 | 买方数量 (Bid Size) | 对应买一到买五挂单的数量 |
-    # | lt_px | 最新成交价 | 最近一笔成交的价格 (Last Trade Price) |
-    # | lt_sz | 最新成交量 | 最近一笔成交的数量 (Last Trade Size) |
-    # | lt_side | 最新成交方向 | 1: 主动买入 (Taker Buy), -1: 主动卖出 (Taker Sell)
-    # 定义 CSV 表头
-    headers = [
-        "ts_loc", "ts_exch", 
-        # Ask 1-5 (Price, Size)
-        "ap0", "as0", "ap1", "as1", "ap2", "as2", "ap3", "as3", "ap4", "as4",
-        # Bid 1-5
-        "bp0", "bs0", "bp1", "bs1", "bp2", "bs2", "bp3", "bs3", "bp4", "bs4",
-        # Trade Info
-        "lt_px", "lt_sz", "lt_side"
-    ]
 
-    # 初始化文件
-    file_exists = os.path.isfile(file_path)
-    # buffering=1: 行缓冲，确保数据实时写入硬盘，不丢失
-    f = open(file_path, 'a+', newline='', buffering=1) 
-    writer = csv.writer(f)
-    if not file_exists:
-        writer.writerow(headers)
-
-    subscribe_msg = {
-        "op": "subscribe",
-        "args": [
-            {"channel": "books5", "instId": config.SYMBOL},
-            {"channel": "trades", "instId": config.SYMBOL}
-        ]
-    }
-
-    while True:
-        try:
-            async with websockets.connect(WS_URL) as ws:
-                await ws.send(json.dumps(subscribe_msg))
-                print(f"✅ [Collector] WebSocket 已连接")
-
-                while True:
-                    msg = await ws.recv()
-                    data = json.loads(msg)
-                    
-                    if 'data' not in data: continue
-                    
-                    channel = data['arg']['channel']
-                    res = data['data'][0]
-
-                    # --- Case A: 成交数据 (更新内存状态) ---
-                    if channel == 'trades':
-                        last_trade_state['px'] = float(res['px'])
-                        last_trade_state['sz'] = float(res['sz'])
-                        last_trade_state['side'] = 1 if res['side'] == 'buy' else -1
-
-                    # --- Case B: 盘口数据 (触发写盘) ---
-                    elif channel == 'books5':
-                        ts_loc = time.time()
-                        ts_exch = int(res['ts'])
-                        
-                        # 提取 5 档数据 (Flatten)
-                        asks = [float(x) for item in res['asks'] for x in item[:2]]
-                        bids = [float(x) for item in res['bids'] for x in item[:2]]
-                        
-                        row = [ts_loc, ts_exch] + asks + bids + [
-                            last_trade_state['px'], 
-                            last_trade_state['sz'], 
-                            last_trade_state['side']
-                        ]
-                        
-                        writer.writerow(row)
-
-        except Exception as e:
-            print(f"⚠️ [Collector] 连接断开: {e}，3秒后重连...")
-            await asyncio.sleep(3)
-            
-            # 检查是否跨天，切换文件
-            new_date = datetime.now().strftime('%Y%m%d')
-            if new_date != current_date:
-                f.close()
-                current_date = new_date
-                file_path = os.path.join(config.DATA_DIR, f"{config.SYMBOL}_{current_date}.csv")
-                f = open(file_path, 'a+', newline='', buffering=1)
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                print(f"📅 [Collector] 切换新文件: {current_date}")
+    rows = queue.SimpleQueue()
+    writer_thread = threading.Thread(target=writer_loop, args=(rows,), name="CSVWriter")
+    writer_thread.start()
+    stopping = threading.Event()
+
+    def on_open(ws):
+        ws.send(SUBSCRIBE_FRAME)
+        print("✅ [Collector] WebSocket 已连接")
+
+    def on_message(ws, msg):
+        data = loads(msg)
+
+        if 'data' not in data: return
+
+        channel = data['arg']['channel']
+        res = data['data'][0]
+
+        # --- Case A: 成交数据 (更新内存状态) ---
+        if channel == 'trades':
+            last_trade_state['px'] = float(res['px'])
+            last_trade_state['sz'] = float(res['sz'])
+            last_trade_state['side'] = _SIDE.get(res['side'], 0)
+
+        # --- Case B: 盘口数据 (交给写盘线程) ---
+        elif channel == 'books5':
+            ts_loc = time.time()
+            ts_exch = int(res['ts'])
+
+            # 提取 5 档数据 (Flatten)：字符串一次性交给 numpy 转换，取 [价格, 数量] 两列
+            asks = np.asarray(res['asks'], dtype=np.float64)[:, :2].ravel().tolist()
+            bids = np.asarray(res['bids'], dtype=np.float64)[:, :2].ravel().tolist()
+
+            row = [ts_loc, ts_exch] + asks + bids + [
+                last_trade_state['px'],
+                last_trade_state['sz'],
+                last_trade_state['side']
+            ]
+            rows.put(row)
+
+    def on_error(ws, error):
+        if isinstance(error, (KeyboardInterrupt, SystemExit)):
+            stopping.set()
+        else:
+            print(f"⚠️ [Collector] WebSocket 错误: {error}")
+
+    ws = WebSocketApp(WS_URL, on_open=on_open, on_message=on_message, on_error=on_error)
+    try:
+        while not stopping.is_set():
+            ws.run_forever(ping_interval=20, ping_timeout=10, skip_utf8_validation=True)
+            if stopping.is_set():
+                break
+            print("⚠️ [Collector] 连接断开，3秒后重连...")
+            time.sleep(3)
+    finally:
+        # 退出时通知写盘线程，剩余数据落盘后关闭文件
+        rows.put(_STOP)
+        writer_thread.join()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(record_loop())
+        record_loop()
     except KeyboardInterrupt:
-        print("录制停止")
\ No newline at end of file
+        print("录制停止")
@@ -2,21 +2,59 @@
 import numpy as np
 import pandas as pd
 import config
+from _kernels import NUMBA_AVAILABLE, realtime_features, rolling_mean, rolling_std, train_row_features
+
+# 离线特征用到的原始列（顺序即 _kernels.train_row_features 中的列下标）
+RAW_COLUMNS = ['ap0', 'bp0',
+               'as0', 'as1', 'as2', 'as3', 'as4',
+               'bs0', 'bs1', 'bs2', 'bs3', 'bs4',
+               'lt_sz', 'lt_side']
+
+class PriceRing:
+    """
+    中间价环形缓冲（实盘用）。
+    预分配定长数组，append 为 O(1) 的下标写入；传给特征内核时直接读底层数组，不做切片复制。
+    """
+    __slots__ = ('buf', 'head', 'filled')
+
+    def __init__(self, capacity=20):
+        # 容量至少 20：实时特征需要最近 20 个中间价
+        self.buf = np.zeros(max(capacity, 20), dtype=np.float64)
+        self.head = 0    # 下一个写入位置
+        self.filled = 0  # 有效点数
+
+    def append(self, price):
+        cap = self.buf.shape[0]
+        self.buf[self.head] = price
+        self.head = (self.head + 1) % cap
+        if self.filled < cap:
+            self.filled += 1
+
+    def __len__(self):
+        return self.filled
+
 
 class FeatureEngine:
     @staticmethod
-    def _safe_div(a, b):
+    def _safe_div(a, b, out=None):
         """
         安全除法，防止除以零。
         
         Args:
             a: 分子 (numpy array 或 scalar)
             b: 分母 (numpy array 或 scalar)
+            out: 可选的输出缓冲，可以直接传分子 a 本身原地计算；为 None 时新分配
             
         Returns:
             除法结果，如果分母为0则返回0。
         """
-        return np.divide(a, b, out=np.zeros_like(a), where=b!=0)
+        if out is None:
+            return np.divide(a, b, out=np.zeros_like(a), where=b!=0)
+        mask = b != 0
+        np.divide(a, b, out=out, where=mask)
+        # 分母为 0 的位置未被写入（out 为 a 时仍是分子），统一置 0
+        np.copyto(out, 0.0, where=~mask)
+        return out
 
     # -------------------------------------------------------
     # 离线训练逻辑 (输入: Pandas DataFrame)
@@ -47,48 +85,89 @@ class FeatureEngine:
         Returns:
             pd.DataFrame: 只包含 config.FEATURES 中定义的特征列的 DataFrame。
         """
-        # 1. 基础价格
-        mid_price = (df['ap0'] + df['bp0']) / 2
-        
-        # 2. Spread (价差)
-        df['spread'] = df['ap0'] - df['bp0']
-        
-        # 3. Imbalance (订单流失衡)
-        # L1 Imbalance
-        df['imbalance_l1'] = FeatureEngine._safe_div(
-            (df['bs0'] - df['as0']), (df['bs0'] + df['as0'])
-        )
-        # L5 Imbalance (简化累加)
-        total_bid_sz = df['bs0'] + df['bs1'] + df['bs2'] + df['bs3'] + df['bs4']
-        total_ask_sz = df['as0'] + df['as1'] + df['as2'] + df['as3'] + df['as4']
-        df['imbalance_l5'] = FeatureEngine._safe_div(
-            (total_bid_sz - total_ask_sz), (total_bid_sz + total_ask_sz)
-        )
+        # 原始列一次性取成 (N, 14) float64 块（价格保留 float64 精度）；Fortran 序保证每一列连续
+        raw = np.asfortranarray(df[RAW_COLUMNS].to_numpy(dtype=np.float64))
+        out = FeatureEngine.calculate_train_features_raw(raw)
+        return pd.DataFrame(out, index=df.index, columns=config.FEATURES, copy=False)
+
+    @staticmethod
+    def calculate_train_features_raw(raw):
+        """
+        离线训练特征计算（ndarray 版本），供不经过 pandas 的加载路径直接调用。
+
+        Args:
+            raw: (N, 14) float64 原始数据块，列顺序同 RAW_COLUMNS，建议 Fortran 序
+
+        Returns:
+            np.ndarray: (N, F) float32 特征块 (Fortran 序)，列顺序同 config.FEATURES
+        """
+        # 各列直接写入一个 (N, F) float32 输出块；Fortran 序可被 DataFrame 零拷贝包装
+        out = np.empty((raw.shape[0], len(config.FEATURES)), dtype=np.float32, order='F')
+
+        # 逐行特征互不依赖：numba 可用时按行多核并行计算，否则走 numpy 向量化
+        if NUMBA_AVAILABLE:
+            train_row_features(raw, out)
+        else:
+            FeatureEngine._row_features_numpy(raw, out)
 
         # 4. RSI (基于中间价，Window=14)
-        delta = mid_price.diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ma_up = up.rolling(window=14).mean()
-        ma_down = down.rolling(window=14).mean()
-        rsi = 100 - (100 / (1 + FeatureEngine._safe_div(ma_up, ma_down)))
-        df['rsi_14'] = rsi.fillna(50)
+        # 滚动窗口有前后依赖，单独串行计算；连续 float64 数组交给滚动窗口内核，不构造中间 Series
+        mid = (raw[:, 0] + raw[:, 1]) / 2
+        delta = np.empty_like(mid)
+        delta[:1] = np.nan
+        np.subtract(mid[1:], mid[:-1], out=delta[1:])
+        up = np.clip(delta, 0, None)
+        down = -np.clip(delta, None, 0)
+        ma_up = rolling_mean(up, 14)
+        ma_down = rolling_mean(down, 14)
+        # 复用 ma_up 作为缓冲，RS -> RSI 全程原地计算
+        rsi = FeatureEngine._safe_div(ma_up, ma_down, out=ma_up)
+        rsi += 1
+        np.divide(100, rsi, out=rsi)
+        np.subtract(100, rsi, out=rsi)
+        rsi[np.isnan(rsi)] = 50.0
+        out[:, 5] = rsi
 
         # 5. Volatility (波动率，Window=20)
-        df['volatility'] = mid_price.rolling(window=20).std().fillna(0)
+        out[:, 6] = rolling_std(mid, 20)
 
-        # 6. Trade Flow (成交流)
-        df['trade_flow'] = df['lt_sz'] * df['lt_side']
+        # 清洗：对输出块一次性把 NaN / Inf 置 0，防止模型报错
+        np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return out
+
+    @staticmethod
+    def _row_features_numpy(raw, out):
+        """
+        逐行特征的 numpy 版本（numba 不可用时使用），与 _kernels.train_row_features 结果一致。
+        写入 out 中除 rsi_14 / volatility 以外的列。
+        """
+        ap0, bp0 = raw[:, 0], raw[:, 1]
+        as0, bs0 = raw[:, 2], raw[:, 7]
+
+        # 2. Spread (价差)
+        out[:, 0] = ap0 - bp0
         
+        # 3. Imbalance (订单流失衡)
+        # L1 Imbalance
+        # 分子是临时数组，直接作为输出缓冲，省去一次 zeros_like 分配
+        diff = bs0 - as0
+        out[:, 1] = FeatureEngine._safe_div(diff, bs0 + as0, out=diff)
+        # L5 Imbalance (简化累加)
+        # 5 档挂单量是连续的列块，单次向量化求和
+        total_ask = raw[:, 2:7].sum(axis=1)
+        total_bid = raw[:, 7:12].sum(axis=1)
+        total = total_bid + total_ask
+        # 原地复用差值数组作为输出；总量为 0 时两侧均为 0，差值本身即为 0
+        imbalance_l5 = total_bid - total_ask
+        np.divide(imbalance_l5, total, out=imbalance_l5, where=total != 0)
+        out[:, 2] = imbalance_l5
+
         # 映射原始量
-        df['ask_sz_0'] = df['as0']
-        df['bid_sz_0'] = df['bs0']
+        out[:, 3] = as0
+        out[:, 4] = bs0
 
-        # 清洗：去除 NaN 和 Inf，防止模型报错
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-        df.fillna(0, inplace=True)
-        
-        return df[config.FEATURES]
+        # 6. Trade Flow (成交流)
+        out[:, 7] = raw[:, 12] * raw[:, 13]
 
     # -------------------------------------------------------
     # 在线实盘逻辑 (输入: 字典/Numpy) -> 未来迁移 C++ 参考基准
@@ -102,58 +181,29 @@ class FeatureEngine:
         Args:
             snapshot (dict): 当前最新的 tick 数据快照。
                              结构示例: {'asks': [[px, sz], ...], 'bids': [[px, sz], ...], 'lt_sz': ..., 'lt_side': ...}
-            history_prices (list): 最近 N 个 tick 的中间价列表，用于计算时序指标 (如 RSI, Volatility)。
+            history_prices (PriceRing | list): 最近 N 个 tick 的中间价，用于计算时序指标 (如 RSI, Volatility)。
+                             传入 PriceRing 时零拷贝读取；传入列表时取最后 20 个。
             
         Returns:
             np.array: 形状为 (1, n_features) 的 numpy 数组，包含计算好的特征向量。
                       如果计算失败或数据不足，返回 None。
         """
         try:
-            # 提取基础变量
-            ap0, as0 = snapshot['asks'][0]
-            bp0, bs0 = snapshot['bids'][0]
-            
-            # 1. Spread
-            spread = ap0 - bp0
-            
-            # 2. Imbalance L1
-            imbalance_l1 = (bs0 - as0) / (bs0 + as0) if (bs0 + as0) > 0 else 0
-            
-            # 3. Imbalance L5
-            sum_as = sum([x[1] for x in snapshot['asks']])
-            sum_bs = sum([x[1] for x in snapshot['bids']])
-            imbalance_l5 = (sum_bs - sum_as) / (sum_bs + sum_as) if (sum_bs + sum_as) > 0 else 0
-            
-            # 4. 历史序列指标 (RSI, Volatility)
-            rsi = 50.0
-            volatility = 0.0
-            
-            if len(history_prices) >= 20:
-                prices = np.array(history_prices[-20:], dtype=np.float32)
-                
-                # Volatility
-                volatility = np.std(prices)
-                
-                # RSI (简化版: 最近14个点的涨跌幅累加)
-                deltas = np.diff(prices[-15:])
-                gains = deltas[deltas > 0].sum()
-                losses = -deltas[deltas < 0].sum()
-                if losses == 0:
-                    rsi = 100.0 if gains > 0 else 50.0
-                else:
-                    rs = gains / losses
-                    rsi = 100 - (100 / (1 + rs))
-            
-            # 5. Trade Flow
-            trade_flow = snapshot.get('lt_sz', 0) * snapshot.get('lt_side', 0)
-            
-            # 组装向量 (必须与 config.FEATURES 顺序一致)
-            features = np.array([[
-                spread, imbalance_l1, imbalance_l5, 
-                as0, bs0, rsi, volatility, trade_flow
-            ]], dtype=np.float32)
-            
-            if np.isnan(features).any(): return None
+            # 在调用方完成解包，内核只接收定长数组和标量
+            asks = np.asarray(snapshot['asks'], dtype=np.float64)
+            bids = np.asarray(snapshot['bids'], dtype=np.float64)
+            if isinstance(history_prices, PriceRing):
+                history, head, count = history_prices.buf, history_prices.head, history_prices.filled
+            else:
+                history = np.asarray(history_prices[-20:], dtype=np.float64)
+                head, count = 0, history.shape[0]
+            lt_sz = float(snapshot.get('lt_sz', 0))
+            lt_side = float(snapshot.get('lt_side', 0))
+
+            # 组装向量 (顺序与 config.FEATURES 一致)
+            features = np.empty((1, len(config.FEATURES)), dtype=np.float32)
+            if not realtime_features(asks, bids, history, head, count, lt_sz, lt_side, features[0]):
+                return None
                 
             return features
             
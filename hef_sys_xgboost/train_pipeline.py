@@ -1,14 +1,47 @@
 # train_pipeline.py
+import os
+
+try:
+    import psutil
+    PHYSICAL_CORES = psutil.cpu_count(logical=False) or os.cpu_count()
+except ImportError:  # psutil 为可选依赖，缺失时按逻辑核数
+    PHYSICAL_CORES = os.cpu_count()
+
+# OpenMP 线程数取物理核数并绑定到物理核，避免超线程上的 hist 超额订阅和跨 NUMA 节点迁移。
+# 必须在导入 xgboost（加载 OpenMP 运行时）之前设置；已显式设置的环境变量不覆盖
+os.environ.setdefault('OMP_NUM_THREADS', str(PHYSICAL_CORES))
+os.environ.setdefault('OMP_PROC_BIND', 'close')
+os.environ.setdefault('OMP_PLACES', 'cores')
+
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-import os
 import glob
+import shutil
+import subprocess
 from skl2onnx import to_onnx, update_registered_converter
 from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
 from onnxmltools.convert.xgboost.operator_converters.xgboost import convert_xgboost
 import config
-from feature_engine import FeatureEngine
+from feature_engine import FeatureEngine, RAW_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow 为可选依赖，缺失时回退 pd.read_csv
+    PYARROW_AVAILABLE = False
+
+if PYARROW_AVAILABLE:
+    # 多线程 C++ 解析器，8 MiB 分块
+    CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+    # 只解析特征用到的列，全部直接解析为 float64
+    RAW_CONVERT_OPTIONS = pacsv.ConvertOptions(column_types={c: pa.float64() for c in RAW_COLUMNS},
+                                               include_columns=RAW_COLUMNS)
+
+# 单日特征缓存目录（需要 pyarrow）
+FEATURE_CACHE_DIR = os.path.join(config.DATA_DIR, "_cache")
 
 # 注册 ONNX 转换器
 update_registered_converter(
@@ -17,34 +50,158 @@ update_registered_converter(
     options={'nocl': [True, False], 'zipmap': [False]}
 )
 
-def load_recent_data(days=3):
+def _cuda_available():
     """
-    加载最近 N 天的 CSV 数据文件。
-    
+    探测是否有可用的 NVIDIA GPU（nvidia-smi 能列出设备）。
+
+    Returns:
+        bool: 找到至少一块 GPU 时为 True
+    """
+    if shutil.which("nvidia-smi") is None:
+        return False
+    try:
+        result = subprocess.run(["nvidia-smi", "-L"], capture_output=True, timeout=10)
+    except Exception:
+        return False
+    return result.returncode == 0 and b"GPU" in result.stdout
+
+# 导入时探测一次：有 GPU 时直方图构建、梯度累加和分裂查找都在 GPU 上完成 (XGBoost >= 2.0)
+DEVICE = "cuda" if _cuda_available() else "cpu"
+
+# 小数据集上线程调度开销大于收益：行数低于该值时 CPU 线程数最多取 4
+SMALL_DATA_ROWS = 50_000
+
+def _build_model(device, n_rows):
+    """
+    构建 XGBoost 分类器。
+
     Args:
-        days (int): 回溯的天数，默认为 3。
-        
+        device (str): "cuda" 或 "cpu"
+        n_rows (int): 训练样本数，用于决定 CPU 线程数
+
     Returns:
-        pd.DataFrame: 合并后的 Pandas DataFrame，包含所有加载的数据。
-        
-    Raises:
-        FileNotFoundError: 如果没有找到任何数据文件。
+        xgb.XGBClassifier: 未训练的模型
     """
+    params = dict(
+        n_estimators=100,
+        max_depth=5,
+        learning_rate=0.1,
+        tree_method='hist',  # GPU / CPU 通用的直方图算法
+        max_bin=256,
+        device=device,
+        objective='binary:logistic'
+    )
+    if device == "cpu":
+        # 线程数取物理核数（GPU 训练不使用 CPU 线程池）
+        params['n_jobs'] = PHYSICAL_CORES if n_rows >= SMALL_DATA_ROWS else min(PHYSICAL_CORES, 4)
+    return xgb.XGBClassifier(**params)
+
+def _recent_files(days):
+    """最近 N 天的 CSV 文件路径（按文件名中的日期排序）"""
     files = sorted(glob.glob(os.path.join(config.DATA_DIR, "*.csv")))
     if not files:
         raise FileNotFoundError("未找到数据文件，请先运行 data_collector.py")
     
     recent_files = files[-days:]
     print(f"📚 [Train] 加载文件: {[os.path.basename(f) for f in recent_files]}")
-    
-    df_list = []
-    for f in recent_files:
+    return recent_files
+
+def _feature_cache_path(csv_path):
+    """
+    单日特征缓存路径。文件名带源 CSV 的 mtime 和大小，
+    源文件有变化（例如当天的文件仍在追加）时缓存自动失效。
+    """
+    st = os.stat(csv_path)
+    name = os.path.basename(csv_path)
+    return os.path.join(FEATURE_CACHE_DIR, f"{name}.{st.st_mtime_ns}.{st.st_size}.feather")
+
+def _read_raw(csv_path):
+    """
+    读取单日 CSV 中特征用到的原始列。
+    pyarrow 可用时各列从 Arrow 缓冲直接拷入 Fortran 序的 float64 块，不经过 pandas。
+
+    Returns:
+        np.ndarray: (N, 14) float64，列顺序同 RAW_COLUMNS
+    """
+    if not PYARROW_AVAILABLE:
+        return np.asfortranarray(pd.read_csv(csv_path, usecols=RAW_COLUMNS)[RAW_COLUMNS].to_numpy(dtype=np.float64))
+    tbl = pacsv.read_csv(csv_path, read_options=CSV_READ_OPTIONS, convert_options=RAW_CONVERT_OPTIONS)
+    raw = np.empty((tbl.num_rows, len(RAW_COLUMNS)), dtype=np.float64, order='F')
+    for j, name in enumerate(RAW_COLUMNS):
+        raw[:, j] = tbl.column(name).to_numpy()
+    return raw
+
+def _day_features(csv_path):
+    """
+    计算单日特征与中间价（用于打标签）。
+
+    pyarrow 可用时结果缓存为 Feather：历史日期的文件不再变化，之后的训练直接内存映射读取，
+    跳过 CSV 解析和特征计算。
+
+    Args:
+        csv_path (str): 单日 CSV 文件路径
+
+    Returns:
+        (X, mid_price): (N, F) float32 特征块（列顺序同 config.FEATURES）与 (N,) float64 中间价
+    """
+    cache_path = _feature_cache_path(csv_path) if PYARROW_AVAILABLE else None
+    if cache_path and os.path.exists(cache_path):
+        tbl = feather.read_table(cache_path, memory_map=True)
+        X = np.empty((tbl.num_rows, len(config.FEATURES)), dtype=np.float32, order='F')
+        for j, name in enumerate(config.FEATURES):
+            X[:, j] = tbl.column(name).to_numpy()
+        return X, tbl.column('mid_price').to_numpy()
+
+    raw = _read_raw(csv_path)
+    X = FeatureEngine.calculate_train_features_raw(raw)
+    mid_price = (raw[:, 0] + raw[:, 1]) * 0.5
+
+    if cache_path:
+        os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+        # 同一源文件的旧缓存（mtime / 大小不同）直接删除
+        for old in glob.glob(os.path.join(FEATURE_CACHE_DIR, f"{os.path.basename(csv_path)}.*.feather")):
+            os.remove(old)
+        # Fortran 序下每列连续，按列零拷贝构造 Arrow 表；
+        # 不压缩：读取时可以直接内存映射，不需要解压缓冲
+        columns = {name: X[:, j] for j, name in enumerate(config.FEATURES)}
+        columns['mid_price'] = mid_price
+        feather.write_feather(pa.table(columns), cache_path, compression='uncompressed')
+    return X, mid_price
+
+def load_recent_features(days=3):
+    """
+    加载最近 N 天的特征与中间价（逐日计算，见 _day_features）。
+
+    注：滚动窗口 (RSI / 波动率) 在每天的文件内独立计算，每天开头的窗口期按缺失处理；
+    标签仍在拼接后的中间价序列上计算，跨天连续。
+
+    Args:
+        days (int): 回溯的天数，默认为 3。
+
+    Returns:
+        (X, mid_price): (N, F) C 连续的 float32 特征矩阵（可直接交给 XGBoost）与 (N,) float64 中间价
+
+    Raises:
+        FileNotFoundError: 如果没有找到任何数据文件。
+    """
+    parts = []
+    for f in _recent_files(days):
         try:
-            df_list.append(pd.read_csv(f))
+            parts.append(_day_features(f))
         except Exception as e:
             print(f"⚠️ 跳过损坏文件 {f}: {e}")
-            
-    return pd.concat(df_list, ignore_index=True)
+
+    # 各天的特征块直接拷入一个预分配的 C 连续矩阵，只拷贝一次
+    n = sum(len(mid) for _, mid in parts)
+    X = np.empty((n, len(config.FEATURES)), dtype=np.float32)
+    mid_price = np.empty(n, dtype=np.float64)
+    start = 0
+    for X_day, mid_day in parts:
+        stop = start + len(mid_day)
+        X[start:stop] = X_day
+        mid_price[start:stop] = mid_day
+        start = stop
+    return X, mid_price
 
 def train_model():
     """
@@ -57,47 +214,44 @@ def train_model():
     4. 训练 XGBoost 分类模型。
     5. 将训练好的模型导出为 ONNX 格式，以便于高性能推理。
     """
-    # 1. 加载数据
-    df = load_recent_data(days=3)
-    print(f"📊 [Train] 原始数据行数: {len(df)}")
-    
-    # 2. 特征计算
-    X = FeatureEngine.calculate_train_features(df)
+    # 1. 加载数据 & 2. 特征计算（历史日期命中缓存时直接读取特征）
+    X, mid_price = load_recent_features(days=3)
+    print(f"📊 [Train] 原始数据行数: {len(X)}")
     
     # 3. 打标签 (Labeling)
-    mid_price = (df['ap0'] + df['bp0']) / 2
+    # 全程 ndarray：未来价用切片平移代替 shift，末尾 PREDICT_HORIZON 行没有未来价，直接截掉
+    h = config.PREDICT_HORIZON
     # 计算未来收益率
-    future_return = mid_price.shift(-config.PREDICT_HORIZON) / mid_price - 1
+    future_return = mid_price[h:] / mid_price[:-h] - 1.0
     
     # 三分类标签: 1(Buy), 0(Hold/Sell) 
     # 注：当前简化为二分类，只预测买点
-    y = np.zeros(len(df))
-    y[future_return > config.LABEL_THRESHOLD] = 1
-    
-    # 清洗标签为空的行
-    valid_idx = ~np.isnan(future_return)
-    X = X[valid_idx]
-    y = y[valid_idx]
+    y = (future_return > config.LABEL_THRESHOLD).astype(np.float32)
+    # 特征已是 C 连续的 float32 块：XGBoost 内部按 float32 分桶，不再做转换拷贝；
+    # 截掉末尾行仍是连续视图。ONNX 导出的样例输入也直接取它
+    X = X[:len(y)]
     
     print(f"🎯 [Train] 正样本(买入机会)比例: {np.mean(y==1):.2%}")
     
     # 4. 训练 XGBoost
-    print("🚀 [Train] 开始训练 (使用 hist 模式)...")
-    model = xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=5,
-        learning_rate=0.1,
-        tree_method='hist',  # CPU 高速模式
-        n_jobs=-1,
-        objective='binary:logistic'
-    )
-    model.fit(X, y)
+    print(f"🚀 [Train] 开始训练 (使用 hist 模式, device={DEVICE})...")
+    model = _build_model(DEVICE, len(X))
+    try:
+        # hist 模式下 sklearn 接口内部即构建 QuantileDMatrix，只分桶一次
+        model.fit(X, y)
+    except xgb.core.XGBoostError as e:
+        if DEVICE == "cpu":
+            raise
+        # 驱动 / CUDA 运行时初始化失败时回退 CPU
+        print(f"⚠️ [Train] GPU 训练失败，回退 CPU: {e}")
+        model = _build_model("cpu", len(X))
+        model.fit(X, y)
     
     # 5. 导出 ONNX
     print("💾 [Train] 正在导出 ONNX...")
     onx = to_onnx(
         model, 
-        X[:1].astype(np.float32), 
+        X[:1], 
         target_opset=12
     )
     
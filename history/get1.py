@@ -5,33 +5,195 @@ ohlcv_1s 表：存储秒级聚合的OHLCV数据
 """
 import asyncio
 import websockets
+from websockets.asyncio.client import connect as ws_connect  # 新版客户端才支持 recv(decode=False)，需要 websockets>=13
 import json
 import sqlite3
 from datetime import datetime
 import logging
-from collections import defaultdict
 import time
+import numpy as np
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:  # msgspec 为可选依赖，缺失时按 dict 解析
+    MSGSPEC_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba 为可选依赖，缺失时以纯 Python 执行同一份代码
+    NUMBA_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+if MSGSPEC_AVAILABLE:
+    class Trade(msgspec.Struct):
+        """币安 @trade 推送中用到的字段（其余字段解码时直接跳过）"""
+        s: str  # 交易对
+        T: int  # 成交时间 (毫秒)
+        p: str  # 价格
+        q: str  # 数量
+
+    _trade_decoder = msgspec.json.Decoder(Trade)
+    # 缺字段 / 类型不符 (ValidationError) 也是 DecodeError 的子类
+    DECODE_ERRORS = (msgspec.DecodeError,)
+
+    def decode_trade(msg):
+        """解析一条成交推送，返回 (symbol, timestamp_ms, price, quantity)"""
+        t = _trade_decoder.decode(msg)
+        return t.s, t.T, float(t.p), float(t.q)
+else:
+    DECODE_ERRORS = (json.JSONDecodeError, KeyError)
+
+    def decode_trade(msg):
+        """解析一条成交推送，返回 (symbol, timestamp_ms, price, quantity)"""
+        data = loads(msg)
+        return data['s'], data['T'], float(data['p']), float(data['q'])
+
+
+def _ohlcv_update_py(ohlcv, ohlcv_sec, dirty, sid, timestamp_sec, price, quantity):
+    """
+    把一笔成交累加进 OHLCV 环形缓冲（字段顺序 open/high/low/close/volume/trade_count）。
+
+    Returns:
+        bool: 槽位被更早的一秒占用且尚未落盘时返回 False（不做修改），调用方落盘后重试
+    """
+    slot = timestamp_sec % ohlcv_sec.shape[1]
+    if dirty[sid, slot]:
+        if ohlcv_sec[sid, slot] != timestamp_sec:
+            return False
+        # 该秒已有数据：原地更新
+        if price > ohlcv[sid, slot, 1]:
+            ohlcv[sid, slot, 1] = price
+        if price < ohlcv[sid, slot, 2]:
+            ohlcv[sid, slot, 2] = price
+        ohlcv[sid, slot, 3] = price
+        ohlcv[sid, slot, 4] += quantity
+        ohlcv[sid, slot, 5] += 1
+        return True
+    # 初始化该秒的OHLCV数据
+    ohlcv[sid, slot, 0] = price
+    ohlcv[sid, slot, 1] = price
+    ohlcv[sid, slot, 2] = price
+    ohlcv[sid, slot, 3] = price
+    ohlcv[sid, slot, 4] = quantity
+    ohlcv[sid, slot, 5] = 1
+    ohlcv_sec[sid, slot] = timestamp_sec
+    dirty[sid, slot] = True
+    return True
+
+
+def _ohlcv_collect_dirty_py(ohlcv, ohlcv_sec, dirty):
+    """
+    收集所有未落盘的槽位。
+
+    Returns:
+        (sids, slots, secs, data)：交易对下标、槽位、秒级时间戳 (int64) 与对应的 (k, 6) OHLCV 数据
+    """
+    n_sym, ring = dirty.shape
+    k = 0
+    for i in range(n_sym):
+        for j in range(ring):
+            if dirty[i, j]:
+                k += 1
+    sids = np.empty(k, dtype=np.int64)
+    slots = np.empty(k, dtype=np.int64)
+    secs = np.empty(k, dtype=np.int64)
+    data = np.empty((k, 6), dtype=np.float64)
+    k = 0
+    for i in range(n_sym):
+        for j in range(ring):
+            if dirty[i, j]:
+                sids[k] = i
+                slots[k] = j
+                secs[k] = ohlcv_sec[i, j]
+                for f in range(6):
+                    data[k, f] = ohlcv[i, j, f]
+                k += 1
+    return sids, slots, secs, data
+
+
+if NUMBA_AVAILABLE:
+    _ohlcv_update = njit(cache=True)(_ohlcv_update_py)
+    _ohlcv_collect_dirty = njit(cache=True)(_ohlcv_collect_dirty_py)
+    # 导入时预热编译，避免收集开始后第一笔成交的 JIT 延迟
+    _warm = (np.zeros((1, 2, 6)), np.full((1, 2), -1, dtype=np.int64), np.zeros((1, 2), dtype=np.bool_))
+    _ohlcv_update(*_warm, 0, 0, 1.0, 1.0)
+    _ohlcv_collect_dirty(*_warm)
+    del _warm
+else:
+    _ohlcv_update = _ohlcv_update_py
+    _ohlcv_collect_dirty = _ohlcv_collect_dirty_py
+
+
 class MillisecondCryptoCollector:
     """毫秒级加密货币数据收集器 - 修复版"""
     
     BINANCE_WS = "wss://stream.binance.com:9443/ws"
     
+    # OHLCV 环形缓冲的秒数：每秒落盘一次，64 秒足够容纳迟到的成交
+    RING_SECONDS = 64
+    
+    # 接收协程与写入协程之间的队列容量
+    QUEUE_SIZE = 20000
+    
+    # 写入连接的 PRAGMA：WAL 日志 + NORMAL 同步，提交时不再每次 fsync 主库文件
+    SQLITE_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=1073741824",
+        "PRAGMA cache_size=-65536",
+    )
+    
     def __init__(self, db_path="crypto_ms.db"):
         self.db_path = db_path
         self.trade_buffer = []
-        self.ohlcv_buffer = defaultdict(dict)  # 用于实时聚合OHLCV数据
+        self._init_ohlcv_buffer([])  # 用于实时聚合OHLCV数据，collect_trades 时按交易对分配
         self.buffer_size = 100
+        self._conn = None  # 长连接，收集期间复用，见 _get_conn
         self._init_database()
     
+    def _get_conn(self):
+        """
+        获取长连接（首次调用时打开）。
+        autocommit 模式 (isolation_level=None)，写入时由 _write_many 显式 BEGIN IMMEDIATE / COMMIT。
+        """
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            for pragma in self.SQLITE_PRAGMAS:
+                self._conn.execute(pragma)
+        return self._conn
+    
+    def close(self):
+        """关闭长连接"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _write_many(self, sql, rows):
+        """在一个显式事务中批量写入，失败时回滚并抛出"""
+        conn = self._get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(sql, rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
     def _init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
         
         # 创建实时交易表（毫秒级）
         cursor.execute('''
@@ -65,10 +227,23 @@ class MillisecondCryptoCollector:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_trade_time ON trades(trade_time)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_ohlcv_symbol_time ON ohlcv_1s(symbol, timestamp)')
         
-        conn.commit()
-        conn.close()
         logger.info("✅ 数据库初始化完成")
     
+    def _init_ohlcv_buffer(self, symbols):
+        """
+        分配 OHLCV 聚合缓冲 (SoA)：
+        - _ohlcv: (交易对, 环形秒槽, 6) float64，字段为 open/high/low/close/volume/trade_count
+        - _ohlcv_sec: 每个槽当前对应的秒级时间戳
+        - _ohlcv_dirty: 槽内是否有未落盘的数据
+        """
+        # 推送中的 symbol 为大写 (BTCUSDT)
+        self._sym_names = [s.upper() for s in symbols]
+        self._sym_id = {s: i for i, s in enumerate(self._sym_names)}
+        shape = (len(symbols), self.RING_SECONDS)
+        self._ohlcv = np.zeros(shape + (6,), dtype=np.float64)
+        self._ohlcv_sec = np.full(shape, -1, dtype=np.int64)
+        self._ohlcv_dirty = np.zeros(shape, dtype=np.bool_)
+    
     def get_top_symbols(self, n=50):
         """获取Top N交易对"""
         top_symbols = [
@@ -80,7 +255,12 @@ class MillisecondCryptoCollector:
         return top_symbols[:n]
     
     async def collect_trades(self, symbols):
-        """收集实时交易数据并实时聚合OHLCV"""
+        """
+        收集实时交易数据并实时聚合OHLCV。
+
+        接收协程只负责收包、解析并放入队列；OHLCV 聚合与数据库写入由 _write_loop 协程完成，
+        落盘在线程池中执行，写库期间不阻塞 WebSocket 收包。
+        """
         streams = [f"{symbol}@trade" for symbol in symbols]
         params = "/".join(streams)
         url = f"{self.BINANCE_WS}/{params}"
@@ -88,58 +268,45 @@ class MillisecondCryptoCollector:
         logger.info(f"🚀 开始连接币安WebSocket...")
         logger.info(f"📊 监听 {len(symbols)} 个交易对: {', '.join(symbols[:5])}...")
         
-        # 上一次聚合的时间戳
-        last_aggregation_time = int(time.time())
+        self._init_ohlcv_buffer(symbols)
+        
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        writer = asyncio.create_task(self._write_loop(queue))
+        # 队列积压超过该值时跳过逐笔日志
+        busy_size = int(self.QUEUE_SIZE * 0.9)
         
         try:
-            async with websockets.connect(url) as ws:
+            # permessage-deflate 压缩推送（与服务端协商，不支持时退回明文帧）
+            async with ws_connect(url, compression="deflate", max_size=1 << 20) as ws:
                 logger.info("✅ WebSocket连接成功！开始接收数据...")
                 
                 trade_count = 0
                 
                 while True:
                     try:
-                        msg = await ws.recv()
-                        data = json.loads(msg)
+                        # 不做 UTF-8 解码，原始 bytes 直接交给 JSON 解析
+                        msg = await ws.recv(decode=False)
                         
-                        # 解析交易数据
-                        trade = {
-                            'symbol': data['s'],
-                            'timestamp_ms': data['T'],
-                            'price': float(data['p']),
-                            'quantity': float(data['q']),
-                            'trade_time': datetime.fromtimestamp(data['T'] / 1000)
-                        }
+                        # 解析交易数据：只保留 4 个原始值，trade_time 由 SQLite 在写入时生成
+                        trade = decode_trade(msg)
                         
-                        # 添加到缓冲区
-                        self.trade_buffer.append(trade)
+                        # 交给写入协程；队列满时等待（背压到 TCP 接收窗口），不丢数据
+                        try:
+                            queue.put_nowait(trade)
+                        except asyncio.QueueFull:
+                            await queue.put(trade)
                         trade_count += 1
                         
-                        # 实时聚合OHLCV数据
-                        self._update_ohlcv_buffer(trade)
-                        
-                        # 实时显示
-                        if trade_count % 10 == 0:
-                            logger.info(f"📈 {trade['symbol']}: ${trade['price']:.4f} | "
-                                      f"数量: {trade['quantity']:.6f} | "
-                                      f"时间: {trade['trade_time'].strftime('%H:%M:%S.%f')[:-3]}")
+                        # 实时显示（时间只在需要打印时格式化）
+                        if trade_count % 10 == 0 and queue.qsize() < busy_size:
+                            symbol, timestamp_ms, price, quantity = trade
+                            trade_time = datetime.fromtimestamp(timestamp_ms / 1000)
+                            logger.info(f"📈 {symbol}: ${price:.4f} | "
+                                      f"数量: {quantity:.6f} | "
+                                      f"时间: {trade_time.strftime('%H:%M:%S.%f')[:-3]}")
                         
-                        # 批量写入数据库
-                        if len(self.trade_buffer) >= self.buffer_size:
-                            self._flush_trade_buffer()
-                            logger.info(f"💾 已保存 {trade_count} 笔交易到数据库")
-                        
-                        # 每秒聚合一次OHLCV数据
-                        current_time = int(time.time())
-                        if current_time > last_aggregation_time:
-                            self._flush_ohlcv_buffer()
-                            last_aggregation_time = current_time
-                        
-                    except json.JSONDecodeError as e:
-                        logger.error(f"❌ JSON解析错误: {e}")
-                        continue
-                    except KeyError as e:
-                        logger.error(f"❌ 数据格式错误: {e}")
+                    except DECODE_ERRORS as e:
+                        logger.error(f"❌ 数据解析错误: {e}")
                         continue
                         
         except websockets.exceptions.WebSocketException as e:
@@ -147,101 +314,112 @@ class MillisecondCryptoCollector:
         except Exception as e:
             logger.error(f"❌ 未知错误: {e}")
         finally:
+            # 通知写入协程处理完队列中剩余的成交后退出（等待进行中的落盘完成，避免与下面的写入并发）
+            if not writer.done():
+                await queue.put(None)
+                await writer
             # 确保退出时保存剩余数据
             if self.trade_buffer:
                 self._flush_trade_buffer()
-            if self.ohlcv_buffer:
-                self._flush_ohlcv_buffer()
+            self._flush_ohlcv_buffer()
+            self.close()
             logger.info("💾 已保存所有剩余数据")
     
-    def _update_ohlcv_buffer(self, trade):
-        """更新OHLCV缓冲区"""
-        symbol = trade['symbol']
-        timestamp_sec = trade['timestamp_ms'] // 1000  # 转换为秒级时间戳
-        price = trade['price']
-        quantity = trade['quantity']
+    async def _write_loop(self, queue):
+        """
+        写入协程：从队列批量取出成交，更新 OHLCV 缓冲，攒够 buffer_size 笔写入交易表，
+        每秒写入一次 OHLCV。数据库写入放到线程池执行。收到 None 时把已取出的成交放入缓冲后退出。
+        """
+        loop = asyncio.get_running_loop()
+        # 上一次聚合的时间戳
+        last_aggregation_time = int(time.time())
+        saved_count = 0
         
-        # 获取或初始化该秒的OHLCV数据
-        if timestamp_sec not in self.ohlcv_buffer[symbol]:
-            self.ohlcv_buffer[symbol][timestamp_sec] = {
-                'open': price,
-                'high': price,
-                'low': price,
-                'close': price,
-                'volume': quantity,
-                'trade_count': 1
-            }
-        else:
-            ohlcv = self.ohlcv_buffer[symbol][timestamp_sec]
-            ohlcv['high'] = max(ohlcv['high'], price)
-            ohlcv['low'] = min(ohlcv['low'], price)
-            ohlcv['close'] = price
-            ohlcv['volume'] += quantity
-            ohlcv['trade_count'] += 1
+        try:
+            while True:
+                trade = await queue.get()
+                stop = trade is None
+                batch = [] if stop else [trade]
+                while not stop and len(batch) < self.buffer_size and not queue.empty():
+                    trade = queue.get_nowait()
+                    if trade is None:
+                        stop = True
+                    else:
+                        batch.append(trade)
+                
+                # 实时聚合OHLCV数据
+                for t in batch:
+                    self._update_ohlcv_buffer(*t)
+                self.trade_buffer.extend(batch)
+                if stop:
+                    return
+                
+                # 批量写入数据库
+                if len(self.trade_buffer) >= self.buffer_size:
+                    saved_count += len(self.trade_buffer)
+                    await loop.run_in_executor(None, self._flush_trade_buffer)
+                    logger.info(f"💾 已保存 {saved_count} 笔交易到数据库")
+                
+                # 每秒聚合一次OHLCV数据
+                current_time = int(time.time())
+                if current_time > last_aggregation_time:
+                    await loop.run_in_executor(None, self._flush_ohlcv_buffer)
+                    last_aggregation_time = current_time
+        except Exception as e:
+            logger.error(f"❌ 写入协程异常退出: {e}")
+    
+    def _update_ohlcv_buffer(self, symbol, timestamp_ms, price, quantity):
+        """更新OHLCV缓冲区（未订阅的交易对忽略）"""
+        sid = self._sym_id.get(symbol)
+        if sid is None:
+            return
+        timestamp_sec = timestamp_ms // 1000  # 转换为秒级时间戳
+        if not _ohlcv_update(self._ohlcv, self._ohlcv_sec, self._ohlcv_dirty, sid, timestamp_sec, price, quantity):
+            # 槽位被更早的一秒占用且尚未落盘（环形缓冲绕回），先落盘再写入
+            self._flush_ohlcv_buffer()
+            _ohlcv_update(self._ohlcv, self._ohlcv_sec, self._ohlcv_dirty, sid, timestamp_sec, price, quantity)
     
     def _flush_trade_buffer(self):
         """批量写入交易数据到数据库"""
         if not self.trade_buffer:
             return
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.executemany('''
+            self._write_many('''
                 INSERT OR REPLACE INTO trades 
                 (symbol, timestamp_ms, price, quantity, trade_time)
-                VALUES (?, ?, ?, ?, ?)
-            ''', [
-                (t['symbol'], t['timestamp_ms'], t['price'], t['quantity'], t['trade_time'])
-                for t in self.trade_buffer
-            ])
-            
-            conn.commit()
+                VALUES (?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', ?2 / 1000.0, 'unixepoch', 'localtime'))
+            ''', self.trade_buffer)
             self.trade_buffer.clear()
-            
+        
         except Exception as e:
             logger.error(f"❌ 交易数据写入错误: {e}")
-        finally:
-            conn.close()
     
     def _flush_ohlcv_buffer(self):
         """批量写入OHLCV数据到数据库"""
-        if not self.ohlcv_buffer:
+        sids, slots, secs, rows = _ohlcv_collect_dirty(self._ohlcv, self._ohlcv_sec, self._ohlcv_dirty)
+        if len(sids) == 0:
             return
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            data_to_insert = []
-            for symbol, timestamps in self.ohlcv_buffer.items():
-                for timestamp_sec, ohlcv in timestamps.items():
-                    data_to_insert.append((
-                        symbol,
-                        timestamp_sec,
-                        ohlcv['open'],
-                        ohlcv['high'],
-                        ohlcv['low'],
-                        ohlcv['close'],
-                        ohlcv['volume'],
-                        ohlcv['trade_count']
-                    ))
+            # 有数据的槽已打包为连续数组，按列整体转换后拼成行
+            data_to_insert = list(zip(
+                [self._sym_names[i] for i in sids.tolist()],
+                secs.tolist(),
+                *rows[:, :5].T.tolist(),  # open/high/low/close/volume
+                rows[:, 5].astype(np.int64).tolist()  # trade_count
+            ))
             
-            cursor.executemany('''
-                INSERT OR REPLACE INTO ohlcv_1s 
+            self._write_many('''
+                INSERT OR REPLACE INTO ohlcv_1s
                 (symbol, timestamp, open, high, low, close, volume, trade_count)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', data_to_insert)
-            
-            conn.commit()
             logger.info(f"📊 已聚合 {len(data_to_insert)} 个OHLCV数据点")
-            self.ohlcv_buffer.clear()
-            
+            self._ohlcv_dirty[sids, slots] = False
+        
         except Exception as e:
             logger.error(f"❌ OHLCV数据写入错误: {e}")
-        finally:
-            conn.close()
     
     def get_statistics(self):
         """获取数据库统计信息"""
@@ -298,20 +476,35 @@ class MillisecondCryptoCollector:
             # 删除现有的OHLCV数据
             cursor.execute("DELETE FROM ohlcv_1s")
             
-            # 从trades表聚合生成OHLCV数据
+            # 从trades表聚合生成OHLCV数据：一遍 GROUP BY 求出每秒的首末成交时间与高低量，
+            # 开盘/收盘价再按主键 (symbol, timestamp_ms) 回表取，不需要窗口函数的分区排序
             cursor.execute('''
+                WITH agg AS (
+                    SELECT
+                        symbol,
+                        timestamp_ms / 1000 AS ts,
+                        MIN(timestamp_ms) AS first_ms,
+                        MAX(timestamp_ms) AS last_ms,
+                        MAX(price) AS high,
+                        MIN(price) AS low,
+                        SUM(quantity) AS volume,
+                        COUNT(*) AS trade_count
+                    FROM trades
+                    GROUP BY symbol, timestamp_ms / 1000
+                )
                 INSERT INTO ohlcv_1s
-                SELECT 
-                    symbol,
-                    timestamp_ms / 1000 as timestamp,
-                    FIRST_VALUE(price) OVER (PARTITION BY symbol, timestamp_ms / 1000 ORDER BY timestamp_ms) as open,
-                    MAX(price) as high,
-                    MIN(price) as low,
-                    LAST_VALUE(price) OVER (PARTITION BY symbol, timestamp_ms / 1000 ORDER BY timestamp_ms) as close,
-                    SUM(quantity) as volume,
-                    COUNT(*) as trade_count
-                FROM trades
-                GROUP BY symbol, timestamp_ms / 1000
+                SELECT
+                    a.symbol,
+                    a.ts,
+                    o.price AS open,
+                    a.high,
+                    a.low,
+                    c.price AS close,
+                    a.volume,
+                    a.trade_count
+                FROM agg a
+                JOIN trades o ON o.symbol = a.symbol AND o.timestamp_ms = a.first_ms
+                JOIN trades c ON c.symbol = a.symbol AND c.timestamp_ms = a.last_ms
             ''')
             
             conn.commit()
@@ -7,7 +7,6 @@ import requests
 import time
 import logging
 from typing import List, Dict, Optional
-import pandas as pd
 
 logging.basicConfig(
     level=logging.INFO,
@@ -2,28 +2,39 @@
 # -*- coding: utf-8 -*-
 """
 Binance 实时虚拟币价格获取 - 稳定增强版
-依赖: pip install websocket-client requests
+依赖: pip install websocket-client requests numpy
 运行: python binance_realtime.py
 
 特性:
 ✅ 动态获取市值前N名币种（默认20名）
-✅ 使用单独流订阅，每个交易对一个WebSocket连接
+✅ 使用组合流订阅，所有交易对共用一个WebSocket连接
 ✅ 24h价格数据、涨跌幅、最高最低价
 ✅ 自动重连，线程安全，连接状态监控
 ✅ 异常处理和资源清理
 """
 
 # 版本号
-__version__ = "2.1.0"
+__version__ = "2.2.0"
 
+import io
 import json
+import sys
 import time
 import threading
 import requests
 import logging
+import re
+from operator import itemgetter
+import numpy as np
 from websocket import WebSocketApp
 from datetime import datetime
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    _json_loads = json.loads
+
 # ANSI 颜色码
 COLOR_GREEN = '\033[92m'
 COLOR_RED = '\033[91m'
@@ -32,6 +43,16 @@ COLOR_BLUE = '\033[94m'
 COLOR_RESET = '\033[0m'
 COLOR_BOLD = '\033[1m'
 
+# ANSI 光标控制：归位重绘代替 cls/clear 子进程清屏
+CURSOR_HOME = '\033[H'
+CLEAR_SCREEN = '\033[2J'
+CLEAR_EOL = '\033[K'
+CLEAR_BELOW = '\033[J'
+
+# 币种代码过滤：1-8 位小写字母；排除稳定币
+_SYMBOL_OK = re.compile(r'[a-z]{1,8}').fullmatch
+_STABLECOINS = frozenset(('usdt', 'usdc', 'busd', 'dai', 'ust', 'tusd', 'usdp'))
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -48,13 +69,16 @@ class BinanceRealtime:
 
     特性:
     - 动态获取市值前N名币种
-    - 单独流订阅（每交易对一个连接）
+    - 组合流订阅（所有交易对共用一个连接）
     - 24h完整价格数据
     - 线程安全
     - 连接健康检查
     - 优雅关闭
     """
 
+    # 24hrTicker 字段：最新价/涨跌额/涨跌幅/最高/最低/成交量/开盘价
+    _TICKER_FIELDS = itemgetter('c', 'p', 'P', 'h', 'l', 'v', 'o')
+
     def __init__(self, top_n=20):
         """
         初始化Binance WebSocket客户端
@@ -65,21 +89,56 @@ class BinanceRealtime:
         self.top_n = top_n
         self.symbols = self._fetch_top_symbols_with_fallback()
         
-        # 数据存储
-        self.price_data = {}
-        self.connections = {}  # 存储每个交易对的连接信息
+        # 数据存储：按交易对下标索引的结构数组（SoA），每个字段一个预分配数组
+        n = len(self.symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.prices = np.zeros(n, dtype=np.float64)
+        self.changes = np.zeros(n, dtype=np.float64)
+        self.change_pct = np.zeros(n, dtype=np.float64)
+        self.highs = np.zeros(n, dtype=np.float64)
+        self.lows = np.zeros(n, dtype=np.float64)
+        self.volumes = np.zeros(n, dtype=np.float64)
+        self.opens = np.zeros(n, dtype=np.float64)
+        self.event_ts = np.zeros(n, dtype=np.int64)
+        self.last_update = np.zeros(n, dtype=np.float64)
+        self.has_data = np.zeros(n, dtype=np.bool_)
+        # 每个交易对的价格格式化函数，首个行情到达时按量级选定
+        self._price_fmt = [None] * n
+        self.connection = {  # 组合流连接信息
+            'ws': None,
+            'connected': False,
+            'last_activity': 0,
+            'thread': None
+        }
         self.lock = threading.Lock()
         
         # 连接管理
         self.is_running = False
-        self.reconnect_attempts = {}
-        self.max_reconnect_per_symbol = 3
+        self.reconnect_attempts = 0
+        self.max_reconnect_attempts = 3
+        self.reconnect_pending = False
         self.connection_timeout = 10
         
-        # 显示控制
-        self.last_display_time = 0
+        # 显示控制：由独立刷新线程按固定间隔重绘，on_message 只负责写数据
         self.display_interval = 2  # 显示更新间隔(秒)
 
+        # 静态的表头/表尾在初始化时拼好，每次刷新原样写出
+        rule = "=" * 100 + f"{CLEAR_EOL}\n"
+        self._title_line = f"{CLEAR_EOL}\n{COLOR_BOLD}✅ Binance WebSocket 实时价格监控 - 稳定增强版{COLOR_RESET}{CLEAR_EOL}\n"
+        self._header_block = (
+            rule
+            + f"{COLOR_BLUE}{'排名':<4} | {'交易对':<12} | {'价格 (USDT)':<18} | {'24h变化':<12} | {'24h最高':<18} | {'状态':<8}{COLOR_RESET}{CLEAR_EOL}\n"
+            + "-" * 100 + f"{CLEAR_EOL}\n"
+        )
+        self._footer_block = (
+            rule
+            + f"📊 数据来源: Binance WebSocket API | 市值排名: CoinGecko{CLEAR_EOL}\n"
+            + f"💡 按 Ctrl+C 退出监控 | 版本: {__version__}{CLEAR_EOL}\n"
+            + rule
+            # 清除帧以下的残留内容（如日志输出）
+            + CLEAR_BELOW
+        )
+
     def _fetch_top_symbols_with_fallback(self):
         """
         动态获取市值前N名币种，带多层回退机制
@@ -159,13 +218,10 @@ class BinanceRealtime:
             
             # 过滤掉稳定币和无效币种
             filtered_coins = []
-            stablecoins = ['usdt', 'usdc', 'busd', 'dai', 'ust', 'tusd', 'usdp']
             
             for coin in data:
                 symbol_lower = coin['symbol'].lower()
-                if (symbol_lower not in stablecoins and 
-                    len(symbol_lower) <= 8 and
-                    symbol_lower.isalpha()):
+                if _SYMBOL_OK(symbol_lower) and symbol_lower not in _STABLECOINS:
                     filtered_coins.append({
                         'id': coin['id'],
                         'symbol': coin['symbol'],
@@ -215,256 +271,257 @@ class BinanceRealtime:
         ]
         return fallback_symbols[:self.top_n]
 
-    def create_connection(self, symbol):
-        """为单个交易对创建WebSocket连接"""
+    def create_combined_connection(self):
+        """为所有交易对创建一个组合流WebSocket连接"""
         if not self.is_running:
             return None
 
-        # 检查重连次数
-        if symbol not in self.reconnect_attempts:
-            self.reconnect_attempts[symbol] = 0
-        
-        if self.reconnect_attempts[symbol] >= self.max_reconnect_per_symbol:
-            logger.warning(f"❌ {symbol} 已达到最大重连次数，停止重连")
-            return None
+        with self.lock:
+            self.reconnect_pending = False
+            if self.reconnect_attempts >= self.max_reconnect_attempts:
+                logger.warning("❌ 组合流已达到最大重连次数，停止重连")
+                return None
+            old_ws = self.connection['ws']
+            self.connection['ws'] = None
+            self.connection['connected'] = False
+
+        # 关闭旧连接（重连场景）
+        if old_ws:
+            try:
+                old_ws.close()
+            except Exception:
+                pass
 
-        # 单独流URL格式：wss://stream.binance.com/ws/{symbol}@ticker
-        ws_url = f"wss://stream.binance.com/ws/{symbol}@ticker"
+        # 组合流URL格式：wss://stream.binance.com:9443/stream?streams=a@ticker/b@ticker
+        streams = "/".join(f"{symbol}@ticker" for symbol in self.symbols)
+        ws_url = f"wss://stream.binance.com:9443/stream?streams={streams}"
 
         try:
             ws = WebSocketApp(
                 ws_url,
-                on_open=lambda ws: self.on_open(ws, symbol),
-                on_message=lambda ws, msg: self.on_message(ws, msg, symbol),
-                on_error=lambda ws, error: self.on_error(ws, error, symbol),
-                on_close=lambda ws, code, msg: self.on_close(ws, code, msg, symbol)
+                on_open=self.on_open,
+                on_message=self.on_message,
+                on_error=self.on_error,
+                on_close=self.on_close
             )
 
-            # 存储连接信息
-            with self.lock:
-                self.connections[symbol] = {
-                    'ws': ws,
-                    'connected': False,
-                    'last_activity': time.time(),
-                    'thread': None
-                }
-
-            # 启动连接线程
             thread = threading.Thread(
-                target=self._run_websocket, 
-                args=(ws, symbol),
+                target=self._run_websocket,
+                args=(ws,),
                 daemon=True,
-                name=f"WS-{symbol}"
+                name="WS-combined"
             )
-            thread.start()
 
             with self.lock:
-                self.connections[symbol]['thread'] = thread
+                self.connection.update({
+                    'ws': ws,
+                    'connected': False,
+                    'last_activity': time.time(),
+                    'thread': thread
+                })
 
-            logger.info(f"🔗 已为 {symbol.upper()} 创建连接")
+            thread.start()
+            logger.info(f"🔗 已创建组合流连接（{len(self.symbols)} 个交易对）")
             return ws
 
         except Exception as e:
-            logger.error(f"❌ 创建 {symbol} 连接失败: {e}")
-            self._schedule_reconnect(symbol)
+            logger.error(f"❌ 创建组合流连接失败: {e}")
+            self._schedule_reconnect()
             return None
 
-    def _run_websocket(self, ws, symbol):
+    def _run_websocket(self, ws):
         """运行WebSocket连接（带超时控制）"""
         try:
-            # 设置运行超时
+            # 设置运行超时；跳过逐帧 UTF-8 校验，文本帧以 bytes 直接交给 JSON 解析
             ws.run_forever(
                 ping_interval=30,
-                ping_timeout=10
+                ping_timeout=10,
+                skip_utf8_validation=True
             )
         except Exception as e:
-            logger.error(f"❌ {symbol} WebSocket运行异常: {e}")
-            self._schedule_reconnect(symbol)
+            logger.error(f"❌ WebSocket运行异常: {e}")
+            self._schedule_reconnect()
 
-    def on_message(self, ws, message, symbol):
-        """处理 WebSocket 消息"""
+    def on_message(self, ws, message):
+        """处理 WebSocket 消息（组合流格式: {"stream": "btcusdt@ticker", "data": {...}}）"""
         try:
-            data = json.loads(message)
+            msg = _json_loads(message)
+            data = msg.get('data')
+            stream = msg.get('stream')
+            if data is None or not stream:
+                return
 
-            # 更新活动时间
-            with self.lock:
-                if symbol in self.connections:
-                    self.connections[symbol]['last_activity'] = time.time()
+            i = self.symbol_index.get(stream.split('@', 1)[0])
+            if i is None:
+                return
+
+            now = time.time()
 
             # Binance Ticker 数据格式
-            if 'e' in data and data['e'] == '24hrTicker':
-                last_price = float(data['c'])
-                price_change = float(data['p'])
-                price_change_percent = float(data['P'])
-                high_24h = float(data['h'])
-                low_24h = float(data['l'])
-                volume_24h = float(data['v'])
-                open_24h = float(data['o'])
-                event_time = data.get('E', int(time.time() * 1000))
-
-                # 保存数据
+            if data.get('e') == '24hrTicker':
+                (last_price, price_change, price_change_percent,
+                 high_24h, low_24h, volume_24h, open_24h) = map(float, self._TICKER_FIELDS(data))
+                event_time = data.get('E') or int(now * 1000)
+
+                # 保存数据：按下标写入各字段数组，同时更新活动时间
                 with self.lock:
-                    self.price_data[symbol] = {
-                        'price': last_price,
-                        'change': price_change,
-                        'change_percent': price_change_percent,
-                        'high_24h': high_24h,
-                        'low_24h': low_24h,
-                        'volume_24h': volume_24h,
-                        'open_24h': open_24h,
-                        'timestamp': event_time,
-                        'last_update': time.time()
-                    }
+                    self.connection['last_activity'] = now
+                    self.prices[i] = last_price
+                    self.changes[i] = price_change
+                    self.change_pct[i] = price_change_percent
+                    self.highs[i] = high_24h
+                    self.lows[i] = low_24h
+                    self.volumes[i] = volume_24h
+                    self.opens[i] = open_24h
+                    self.event_ts[i] = event_time
+                    self.last_update[i] = now
+                    if not self.has_data[i]:
+                        self._price_fmt[i] = self._pick_price_fmt(last_price)
+                        self.has_data[i] = True
 
                 # 重置重连计数（连接正常）
-                self.reconnect_attempts[symbol] = 0
-
-                # 定时更新显示
-                current_time = time.time()
-                if current_time - self.last_display_time >= self.display_interval:
-                    self.last_display_time = current_time
-                    self._display_all_prices()
+                self.reconnect_attempts = 0
+            else:
+                with self.lock:
+                    self.connection['last_activity'] = now
 
         except Exception as e:
-            logger.error(f"❌ 处理 {symbol} 消息时出错: {e}")
+            logger.error(f"❌ 处理消息时出错: {e}")
 
-    def on_error(self, ws, error, symbol):
+    def on_error(self, ws, error):
         """WebSocket 错误处理"""
-        logger.error(f"❌ {symbol} WebSocket 错误: {error}")
+        logger.error(f"❌ WebSocket 错误: {error}")
         with self.lock:
-            if symbol in self.connections:
-                self.connections[symbol]['connected'] = False
+            if ws is not self.connection['ws']:
+                return  # 已被新连接替换的旧连接
+            self.connection['connected'] = False
         
-        self._schedule_reconnect(symbol)
+        self._schedule_reconnect()
 
-    def on_close(self, ws, close_status_code, close_msg, symbol):
+    def on_close(self, ws, close_status_code, close_msg):
         """WebSocket 连接关闭"""
-        logger.warning(f"⚠️  {symbol} WebSocket 连接已关闭: {close_status_code} - {close_msg}")
+        logger.warning(f"⚠️  WebSocket 连接已关闭: {close_status_code} - {close_msg}")
         
         with self.lock:
-            if symbol in self.connections:
-                self.connections[symbol]['connected'] = False
+            if ws is not self.connection['ws']:
+                return  # 已被新连接替换的旧连接
+            self.connection['connected'] = False
         
-        self._schedule_reconnect(symbol)
+        self._schedule_reconnect()
 
-    def on_open(self, ws, symbol):
+    def on_open(self, ws):
         """WebSocket 连接建立"""
-        logger.info(f"✅ {symbol.upper()} 连接已建立")
+        logger.info(f"✅ 组合流连接已建立（{len(self.symbols)} 个交易对）")
         with self.lock:
-            if symbol in self.connections:
-                self.connections[symbol]['connected'] = True
-                self.connections[symbol]['last_activity'] = time.time()
+            self.connection['connected'] = True
+            self.connection['last_activity'] = time.time()
 
-    def _schedule_reconnect(self, symbol):
-        """安排重连"""
+    def _schedule_reconnect(self):
+        """安排重连（同一时间只保留一个待执行的重连）"""
         if not self.is_running:
             return
 
-        # 增加重连计数
-        if symbol not in self.reconnect_attempts:
-            self.reconnect_attempts[symbol] = 0
-        self.reconnect_attempts[symbol] += 1
-
-        if self.reconnect_attempts[symbol] <= self.max_reconnect_per_symbol:
-            delay = min(2 ** self.reconnect_attempts[symbol], 30)  # 指数退避，最大30秒
-            logger.info(f"🔄 {symbol} 将在 {delay} 秒后重连 (尝试 {self.reconnect_attempts[symbol]}/{self.max_reconnect_per_symbol})")
+        with self.lock:
+            if self.reconnect_pending:
+                return
+            self.reconnect_attempts += 1
+            attempts = self.reconnect_attempts
+            if attempts <= self.max_reconnect_attempts:
+                self.reconnect_pending = True
+
+        if attempts <= self.max_reconnect_attempts:
+            delay = min(2 ** attempts, 30)  # 指数退避，最大30秒
+            logger.info(f"🔄 将在 {delay} 秒后重连 (尝试 {attempts}/{self.max_reconnect_attempts})")
             
             # 使用定时器进行重连
-            timer = threading.Timer(delay, self.create_connection, [symbol])
+            timer = threading.Timer(delay, self.create_combined_connection)
             timer.daemon = True
             timer.start()
         else:
-            logger.error(f"❌ {symbol} 已达到最大重连次数 {self.max_reconnect_per_symbol}")
+            logger.error(f"❌ 已达到最大重连次数 {self.max_reconnect_attempts}")
 
     def _check_connection_health(self):
         """检查连接健康状态"""
         if not self.is_running:
             return
 
-        current_time = time.time()
-        unhealthy_connections = []
-
         with self.lock:
-            for symbol, conn_info in self.connections.items():
-                # 检查连接状态和活动时间
-                if (not conn_info['connected'] or 
-                    current_time - conn_info['last_activity'] > self.connection_timeout):
-                    unhealthy_connections.append(symbol)
-
-        # 重新连接不健康的连接
-        for symbol in unhealthy_connections:
-            logger.warning(f"⚠️  {symbol} 连接不健康，尝试重新连接")
-            self._schedule_reconnect(symbol)
+            healthy = (self.connection['connected'] and
+                       time.time() - self.connection['last_activity'] <= self.connection_timeout)
+
+        if not healthy:
+            logger.warning("⚠️  组合流连接不健康，尝试重新连接")
+            self._schedule_reconnect()
+
+    @staticmethod
+    def _pick_price_fmt(price):
+        """按价格量级选定格式化函数（每个交易对只选一次）"""
+        if price >= 1000:
+            return "${:,.2f}".format
+        if price >= 1:
+            return "${:,.4f}".format
+        return "${:,.6f}".format
 
     def _display_all_prices(self):
-        """显示所有币种价格汇总（清屏刷新）"""
-        import os
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-        # 统计连接状态
-        connected_count = 0
+        """显示所有币种价格汇总（光标归位重绘，整帧一次写出）"""
+        # 锁内只做数组快照，格式化在锁外完成
         with self.lock:
-            for symbol in self.symbols:
-                if (symbol in self.connections and 
-                    self.connections[symbol]['connected'] and
-                    symbol in self.price_data):
-                    connected_count += 1
-
-        print(f"\n{COLOR_BOLD}✅ Binance WebSocket 实时价格监控 - 稳定增强版{COLOR_RESET}")
-        print(f"📡 交易对: {len(self.symbols)} 个 | {COLOR_GREEN}在线: {connected_count} 个{COLOR_RESET}")
-        print(f"🕐 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 100)
-        print(f"{COLOR_BLUE}{'排名':<4} | {'交易对':<12} | {'价格 (USDT)':<18} | {'24h变化':<12} | {'24h最高':<18} | {'状态':<8}{COLOR_RESET}")
-        print("-" * 100)
+            connected = self.connection['connected']
+            has_data = self.has_data.tolist()
+            prices = self.prices.tolist()
+            change_pct = self.change_pct.tolist()
+            highs = self.highs.tolist()
+            last_update = self.last_update.tolist()
+            price_fmt = list(self._price_fmt)
 
-        with self.lock:
-            for idx, symbol in enumerate(self.symbols, 1):
-                display_symbol = symbol.upper()
-                
-                if symbol in self.price_data:
-                    data = self.price_data[symbol]
-                    price = data['price']
-                    change_percent = data['change_percent']
-                    high_24h = data['high_24h']
-
-                    # 格式化价格显示
-                    if price >= 1000:
-                        price_str = f"${price:,.2f}"
-                        high_str = f"${high_24h:,.2f}"
-                    elif price >= 1:
-                        price_str = f"${price:,.4f}"
-                        high_str = f"${high_24h:,.4f}"
-                    else:
-                        price_str = f"${price:,.6f}"
-                        high_str = f"${high_24h:,.6f}"
-
-                    # 格式化24h变化
-                    if change_percent >= 0:
-                        change_str = f"{COLOR_GREEN}▲{change_percent:+.2f}%{COLOR_RESET}"
-                    else:
-                        change_str = f"{COLOR_RED}▼{change_percent:.2f}%{COLOR_RESET}"
-
-                    # 检查数据新鲜度
-                    last_update = data.get('last_update', 0)
-                    if time.time() - last_update < 10:  # 10秒内算实时
-                        status = f"{COLOR_GREEN}实时{COLOR_RESET}"
-                    else:
-                        status = f"{COLOR_YELLOW}延迟{COLOR_RESET}"
-
-                    print(f"{idx:<4} | {COLOR_BOLD}{display_symbol:<12}{COLOR_RESET} | {price_str:<18} | {change_str:<12} | {high_str:<18} | {status}")
+        # 统计连接状态
+        connected_count = sum(has_data) if connected else 0
+        now = time.time()
+
+        buf = io.StringIO()
+        w = buf.write
+        # 每行以 \x1b[K 结尾，清除上一帧残留的行尾字符
+        w(CURSOR_HOME)
+        w(self._title_line)
+        w(f"📡 交易对: {len(self.symbols)} 个 | {COLOR_GREEN}在线: {connected_count} 个{COLOR_RESET}{CLEAR_EOL}\n")
+        w(f"🕐 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{CLEAR_EOL}\n")
+        w(self._header_block)
+
+        # 循环内用到的常量提到局部变量
+        bold, reset = COLOR_BOLD, COLOR_RESET
+        up, down = f"{COLOR_GREEN}▲", f"{COLOR_RED}▼"
+        live = f"{COLOR_GREEN}实时{COLOR_RESET}"
+        delayed = f"{COLOR_YELLOW}延迟{COLOR_RESET}"
+        waiting = f"{COLOR_YELLOW}等待数据...{COLOR_RESET:<18}"
+        # 无数据行的连接状态整帧相同
+        conn_status = f"{COLOR_YELLOW}连接中{COLOR_RESET}" if connected else f"{COLOR_RED}离线{COLOR_RESET}"
+        tail = f"{CLEAR_EOL}\n"
+
+        for i, symbol in enumerate(self.symbols):
+            lead = f"{i + 1:<4} | {bold}{symbol.upper():<12}{reset} | "
+
+            if has_data[i]:
+                fmt = price_fmt[i]
+                change_percent = change_pct[i]
+
+                # 24h变化：正数带 + 号，负数自带 - 号
+                if change_percent >= 0:
+                    change_str = "".join((up, format(change_percent, '+.2f'), "%", reset))
                 else:
-                    # 检查连接状态
-                    conn_status = f"{COLOR_RED}离线{COLOR_RESET}"
-                    if symbol in self.connections:
-                        if self.connections[symbol]['connected']:
-                            conn_status = f"{COLOR_YELLOW}连接中{COLOR_RESET}"
-                    
-                    print(f"{idx:<4} | {COLOR_BOLD}{display_symbol:<12}{COLOR_RESET} | {COLOR_YELLOW}等待数据...{COLOR_RESET:<18} | {'--':<12} | {'--':<18} | {conn_status}")
-
-        print("=" * 100)
-        print(f"📊 数据来源: Binance WebSocket API | 市值排名: CoinGecko")
-        print(f"💡 按 Ctrl+C 退出监控 | 版本: {__version__}")
-        print("=" * 100)
+                    change_str = "".join((down, format(change_percent, '.2f'), "%", reset))
+
+                # 检查数据新鲜度：10秒内算实时
+                status = live if now - last_update[i] < 10 else delayed
+
+                w("".join((lead, format(fmt(prices[i]), '<18'), " | ", format(change_str, '<12'),
+                           " | ", format(fmt(highs[i]), '<18'), " | ", status, tail)))
+            else:
+                w("".join((lead, waiting, " | ", f"{'--':<12}", " | ", f"{'--':<18}", " | ", conn_status, tail)))
+
+        w(self._footer_block)
+
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
     def start_health_check(self):
         """启动健康检查线程"""
@@ -481,32 +538,44 @@ class BinanceRealtime:
         health_thread.start()
         return health_thread
 
+    def start_refresh(self):
+        """启动显示刷新线程"""
+        def refresh_loop():
+            while self.is_running:
+                time.sleep(self.display_interval)
+                if self.is_running:
+                    self._display_all_prices()
+
+        refresh_thread = threading.Thread(
+            target=refresh_loop,
+            daemon=True,
+            name="DisplayRefresh"
+        )
+        refresh_thread.start()
+        return refresh_thread
+
     def start(self):
         """启动所有连接"""
         self.is_running = True
         
         print(f"{COLOR_BOLD}🚀 启动 Binance 实时价格监控 - 稳定增强版{COLOR_RESET}")
-        print(f"💡 使用单独流API | 每个交易对独立连接")
+        print(f"💡 使用组合流API | 所有交易对共用一个连接")
         print(f"📊 动态获取市值前{self.top_n}名币种")
         print(f"🛡️  自动重连 | 健康检查 | 异常处理")
-        print(f"📡 正在为 {len(self.symbols)} 个交易对创建连接...\n")
+        print(f"📡 正在为 {len(self.symbols)} 个交易对创建组合流连接...\n")
 
-        # 为每个交易对创建连接
-        connection_delay = 0.2  # 连接间延迟，避免同时创建过多连接
-        for symbol in self.symbols:
-            if not self.is_running:
-                break
-            self.create_connection(symbol)
-            time.sleep(connection_delay)
+        self.create_combined_connection()
 
         # 启动健康检查
         self.start_health_check()
         
-        print(f"✅ 所有连接已创建，等待数据推送...\n")
+        print(f"✅ 连接已创建，等待数据推送...\n")
         time.sleep(2)
 
-        # 初始显示
+        # 初始显示：仅首帧整屏清除一次，之后光标归位覆盖重绘
+        sys.stdout.write(CLEAR_SCREEN)
         self._display_all_prices()
+        self.start_refresh()
 
         # 主循环
         try:
@@ -523,17 +592,18 @@ class BinanceRealtime:
         logger.info("🛑 正在停止监控...")
         self.is_running = False
         
-        # 关闭所有WebSocket连接
+        # 关闭WebSocket连接
         with self.lock:
-            for symbol, conn_info in self.connections.items():
-                try:
-                    if conn_info['ws']:
-                        conn_info['ws'].close()
-                except Exception as e:
-                    logger.error(f"❌ 关闭 {symbol} 连接时出错: {e}")
-            
-            self.connections.clear()
-            self.price_data.clear()
+            ws = self.connection['ws']
+            self.connection['ws'] = None
+            self.connection['connected'] = False
+            self.has_data[:] = False
+
+        try:
+            if ws:
+                ws.close()
+        except Exception as e:
+            logger.error(f"❌ 关闭连接时出错: {e}")
         
         print(f"\n\n👋 已停止Binance实时价格监控")
 
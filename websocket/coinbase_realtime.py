@@ -12,16 +12,27 @@ Coinbase Pro WebSocket API 公共频道说明:
 - 取消订阅: {"type": "unsubscribe", "product_ids": ["BTC-USD"], "channels": ["ticker"]}
 """
 
+import io
 import json
+import os
 import time
 import threading
 import requests
 import logging
+import re
 import sys
 import argparse
 from websocket import WebSocketApp
 from datetime import datetime
 
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # orjson 为可选依赖，缺失时回退标准库
+    loads = json.loads
+    dumps = json.dumps
+
 # ANSI 颜色码
 COLOR_GREEN = '\033[92m'
 COLOR_RED = '\033[91m'
@@ -30,6 +41,27 @@ COLOR_BLUE = '\033[94m'
 COLOR_RESET = '\033[0m'
 COLOR_BOLD = '\033[1m'
 
+# ANSI 光标控制
+CLEAR_SCREEN = '\033[H\033[2J'
+CLEAR_EOL = '\033[K'
+# 表格布局：前 7 行为标题/状态/表头，之后每个交易对固定占一行
+HEADER_LINES = 7
+
+# 行模板：\033[{line};1H 定位到该行，行尾 \033[K 清除残留字符
+ROW_FMT = ("\033[{line};1H{idx:<4} | " + COLOR_BOLD + "{symbol:<12}" + COLOR_RESET
+           + " | {price:<18} | {change:<12} | {high:<18} | {status}" + CLEAR_EOL)
+WAIT_FMT = ("\033[{line};1H{idx:<4} | " + COLOR_BOLD + "{symbol:<12}" + COLOR_RESET
+            + " | " + COLOR_YELLOW + "等待数据..." + f"{COLOR_RESET:<18}"
+            + f" | {'--':<12} | {'--':<18} | " + COLOR_RED + "离线" + COLOR_RESET + CLEAR_EOL)
+CHANGE_UP_FMT = COLOR_GREEN + "▲{:+.2f}%" + COLOR_RESET
+CHANGE_DOWN_FMT = COLOR_RED + "▼{:.2f}%" + COLOR_RESET
+STATUS_LIVE = f"{COLOR_GREEN}实时{COLOR_RESET}"
+STATUS_DELAYED = f"{COLOR_YELLOW}延迟{COLOR_RESET}"
+
+# 币种代码过滤：1-8 位小写字母；排除稳定币
+_SYMBOL_OK = re.compile(r'[a-z]{1,8}').fullmatch
+_STABLECOINS = frozenset(('usdt', 'usdc', 'busd', 'dai', 'ust', 'tusd', 'usdp'))
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -44,6 +76,9 @@ logger = logging.getLogger(__name__)
 class CoinbaseRealtime:
     """Coinbase Pro WebSocket 实时价格监控 - 优化稳定版"""
 
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'infosx')
+    CACHE_TTL = 3600  # 币种列表本地缓存有效期(秒)
+
     def __init__(self, top_n=20):
         """
         初始化Coinbase WebSocket客户端
@@ -56,18 +91,38 @@ class CoinbaseRealtime:
         self.top_n = top_n
         self.symbols = self._fetch_top_symbols_with_fallback()
 
+        # 订阅帧在初始化时按批次序列化一次，重连时直接复用: [(交易对数量, 帧), ...]
+        batch_size = 10  # 分批订阅，避免消息过大
+        batches = [self.symbols[i:i + batch_size] for i in range(0, len(self.symbols), batch_size)]
+        self._subscribe_frames = [
+            (len(batch), dumps({"type": "subscribe", "product_ids": batch, "channels": ["ticker"]}))
+            for batch in batches
+        ]
+
+        # 消息分发表：type -> 处理函数（心跳等未登记的类型直接忽略）
+        self._handlers = {
+            'ticker': self._process_ticker_data,
+            'subscriptions': self._log_subscriptions,
+            'unsubscribe': self._log_unsubscribe,
+        }
+
         # 存储价格数据
         self.price_data = {}
         self.reconnect_count = 0
         self.max_reconnect = 5
         self.ws_connected = False
         self.last_display_time = 0
-        self.first_display = True
+        # 已绘制到屏幕上的行状态，用于差量重绘；为空时整屏重绘
+        self._rendered = {}
 
     def _fetch_top_symbols_with_fallback(self):
         """
         动态获取市值前N名币种，带多层回退机制
         """
+        cached = self._load_cached_symbols()
+        if cached:
+            return cached
+
         max_retries = 3
         for attempt in range(max_retries):
             try:
@@ -75,6 +130,7 @@ class CoinbaseRealtime:
                 symbols = self._fetch_valid_coinbase_symbols()
                 if symbols and len(symbols) >= min(10, self.top_n):
                     logger.info(f"✅ 成功获取 {len(symbols)} 个有效交易对")
+                    self._save_cached_symbols(symbols)
                     return symbols
                 else:
                     logger.warning(f"⚠️ 第 {attempt + 1} 次获取失败，有效交易对数量不足")
@@ -89,6 +145,35 @@ class CoinbaseRealtime:
         logger.warning("⚠️ 使用备用币种列表")
         return self._get_fallback_symbols()
 
+    def _symbols_cache_path(self):
+        """币种列表缓存文件路径（按数量区分）"""
+        return os.path.join(self.CACHE_DIR, f"coinbase_top{self.top_n}.json")
+
+    def _load_cached_symbols(self):
+        """读取未过期的本地币种列表缓存"""
+        path = self._symbols_cache_path()
+        try:
+            if time.time() - os.path.getmtime(path) >= self.CACHE_TTL:
+                return None
+            with open(path, 'rb') as f:
+                symbols = loads(f.read())
+            logger.info(f"✅ 使用本地缓存的 {len(symbols)} 个交易对")
+            return symbols
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ 读取币种缓存失败: {e}")
+            return None
+
+    def _save_cached_symbols(self, symbols):
+        """写入本地币种列表缓存（失败不影响主流程）"""
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            with open(self._symbols_cache_path(), 'w') as f:
+                f.write(dumps(symbols))
+        except Exception as e:
+            logger.warning(f"⚠️ 写入币种缓存失败: {e}")
+
     def _fetch_valid_coinbase_symbols(self):
         """
         获取有效的Coinbase交易对，确保交易对在Coinbase上真实存在
@@ -172,13 +257,10 @@ class CoinbaseRealtime:
             
             # 过滤掉稳定币和无效币种
             filtered_coins = []
-            stablecoins = ['usdt', 'usdc', 'busd', 'dai', 'ust', 'tusd', 'usdp']
             
             for coin in data:
                 symbol_lower = coin['symbol'].lower()
-                if (symbol_lower not in stablecoins and 
-                    len(symbol_lower) <= 8 and
-                    symbol_lower.isalpha()):
+                if _SYMBOL_OK(symbol_lower) and symbol_lower not in _STABLECOINS:
                     filtered_coins.append({
                         'id': coin['id'],
                         'symbol': coin['symbol'],
@@ -204,35 +286,25 @@ class CoinbaseRealtime:
         return fallback_symbols[:self.top_n]
 
     def on_message(self, ws, message):
-        """处理WebSocket消息"""
+        """处理WebSocket消息（按 type 查表分发）"""
         try:
-            data = json.loads(message)
-
-            # 检查是否是订阅成功响应
-            if 'type' in data:
-                # 订阅确认
-                if data['type'] == 'subscriptions':
-                    logger.info(f"✅ 订阅成功:")
-                    for channel in data['channels']:
-                        logger.info(f"  - {channel['name']}: {', '.join(channel['product_ids'])}")
-                    return
-
-                # 取消订阅确认
-                if data['type'] == 'unsubscribe':
-                    logger.info(f"✅ 取消订阅成功: {data['product_id']}")
-                    return
-
-                # ticker数据推送
-                if data['type'] == 'ticker' and 'product_id' in data:
-                    self._process_ticker_data(data)
-
-                # 心跳机制
-                if data['type'] == 'heartbeat':
-                    return
-
+            data = loads(message)
+            handler = self._handlers.get(data.get('type'))
+            if handler is not None:
+                handler(data)
         except Exception as e:
             logger.error(f"❌ 处理消息时出错: {e}")
 
+    def _log_subscriptions(self, data):
+        """订阅确认"""
+        logger.info(f"✅ 订阅成功:")
+        for channel in data['channels']:
+            logger.info(f"  - {channel['name']}: {', '.join(channel['product_ids'])}")
+
+    def _log_unsubscribe(self, data):
+        """取消订阅确认"""
+        logger.info(f"✅ 取消订阅成功: {data['product_id']}")
+
     def _process_ticker_data(self, data):
         """处理ticker数据"""
         try:
@@ -244,6 +316,7 @@ class CoinbaseRealtime:
             volume_24h = float(data['volume_24h'])
             best_bid = float(data['best_bid'])
             best_ask = float(data['best_ask'])
+            now = time.monotonic()  # 单调时钟：仅用于节流和在线判断，不受系统校时影响
 
             # 计算24h变化
             if open_24h > 0:
@@ -262,80 +335,95 @@ class CoinbaseRealtime:
                 'ask': best_ask,
                 'change_24h': change_24h,
                 'trade_id': data.get('trade_id', 0),
-                'last_update': time.time()
+                'last_update': now
             }
 
             # 定时更新显示（每2秒）
-            current_time = time.time()
-            if current_time - self.last_display_time >= 2:
-                self.last_display_time = current_time
+            if now - self.last_display_time >= 2:
+                self.last_display_time = now
                 self._display_all_prices()
 
         except (KeyError, ValueError) as e:
             logger.error(f"❌ 处理ticker数据出错: {e}")
 
     def _display_all_prices(self):
-        """显示所有币种价格汇总（清屏刷新）"""
-        import os
-        # 首次显示不清屏，后续显示清屏
-        if not self.first_display:
-            os.system('cls' if os.name == 'nt' else 'clear')
-        else:
-            self.first_display = False
-
-        online_count = self._get_online_count()
-        
-        print(f"\n{COLOR_BOLD}✅ Coinbase Pro WebSocket 实时价格监控 - 动态市值前{self.top_n}名{COLOR_RESET}")
-        print(f"📡 已订阅 {len(self.symbols)} 个交易对 | {COLOR_GREEN}在线 {online_count} 个{COLOR_RESET}")
-        print(f"🕐 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 100)
-        print(f"{COLOR_BLUE}{'排名':<4} | {'交易对':<12} | {'价格 (USD)':<18} | {'24h变化':<12} | {'24h最高':<18} | {'状态':<8}{COLOR_RESET}")
-        print("-" * 100)
-
+        """显示所有币种价格汇总（差量重绘：只重写发生变化的行）"""
+        now = time.monotonic()
+        online_count = self._get_online_count(now)
+        full = not self._rendered
+        n = len(self.symbols)
+
+        buf = io.StringIO()
+        w = buf.write
+
+        if full:
+            # 整屏重绘：首次显示或重连之后
+            w(CLEAR_SCREEN)
+            w(f"\n{COLOR_BOLD}✅ Coinbase Pro WebSocket 实时价格监控 - 动态市值前{self.top_n}名{COLOR_RESET}\n")
+            w("\n\n")  # 状态行占位，下面统一刷新
+            w("=" * 100 + "\n")
+            w(f"{COLOR_BLUE}{'排名':<4} | {'交易对':<12} | {'价格 (USD)':<18} | {'24h变化':<12} | {'24h最高':<18} | {'状态':<8}{COLOR_RESET}\n")
+            w("-" * 100 + "\n")
+            w("\n" * n)  # 行占位
+            w("=" * 100 + "\n")
+            w(f"📊 数据来源: Coinbase Pro WebSocket API | 市值排名: CoinGecko\n")
+            w("\n")  # 重连状态行占位
+            w("=" * 100 + "\n")
+
+        # 状态行（在线数量、更新时间）每次都刷新
+        w(f"\033[3;1H📡 已订阅 {n} 个交易对 | {COLOR_GREEN}在线 {online_count} 个{COLOR_RESET}{CLEAR_EOL}")
+        w(f"\033[4;1H🕐 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{CLEAR_EOL}")
+
+        rendered = self._rendered
+        row_fmt = ROW_FMT.format
+        wait_fmt = WAIT_FMT.format
         for idx, symbol in enumerate(self.symbols, 1):
-            if symbol in self.price_data:
-                data = self.price_data[symbol]
+            data = self.price_data.get(symbol)
+            if data is not None:
                 price = data['last']
                 change_24h = data['change_24h']
                 high_24h = data['high']
+                is_live = now - data.get('last_update', 0) < 10  # 10秒内更新的数据
+                state = (price, change_24h, high_24h, is_live)
+            else:
+                state = None
+
+            # 与上次绘制的内容相同则跳过该行
+            if not full and symbol in rendered and rendered[symbol] == state:
+                continue
+            rendered[symbol] = state
 
+            line = HEADER_LINES + idx
+            if state is not None:
                 # 格式化价格显示
                 if price >= 1000:
-                    price_str = f"${price:,.2f}"
-                    high_str = f"${high_24h:,.2f}"
+                    price_fmt = "${:,.2f}".format
                 elif price >= 1:
-                    price_str = f"${price:,.4f}"
-                    high_str = f"${high_24h:,.4f}"
+                    price_fmt = "${:,.4f}".format
                 else:
-                    price_str = f"${price:,.6f}"
-                    high_str = f"${high_24h:,.6f}"
+                    price_fmt = "${:,.6f}".format
 
                 # 格式化24h变化
-                if change_24h >= 0:
-                    change_str = f"{COLOR_GREEN}▲{change_24h:+.2f}%{COLOR_RESET}"
-                else:
-                    change_str = f"{COLOR_RED}▼{change_24h:.2f}%{COLOR_RESET}"
-
-                # 检查数据新鲜度
-                last_update = data.get('last_update', 0)
-                if time.time() - last_update < 10:  # 10秒内更新的数据
-                    status = f"{COLOR_GREEN}实时{COLOR_RESET}"
-                else:
-                    status = f"{COLOR_YELLOW}延迟{COLOR_RESET}"
+                change_str = (CHANGE_UP_FMT if change_24h >= 0 else CHANGE_DOWN_FMT).format(change_24h)
 
-                print(f"{idx:<4} | {COLOR_BOLD}{symbol:<12}{COLOR_RESET} | {price_str:<18} | {change_str:<12} | {high_str:<18} | {status}")
+                w(row_fmt(line=line, idx=idx, symbol=symbol, price=price_fmt(price), change=change_str,
+                          high=price_fmt(high_24h), status=STATUS_LIVE if is_live else STATUS_DELAYED))
             else:
-                print(f"{idx:<4} | {COLOR_BOLD}{symbol:<12}{COLOR_RESET} | {COLOR_YELLOW}等待数据...{COLOR_RESET:<18} | {'--':<12} | {'--':<18} | {COLOR_RED}离线{COLOR_RESET}")
+                w(wait_fmt(line=line, idx=idx, symbol=symbol))
+
+        # 重连状态行，最后把光标停在表格下方
+        footer = HEADER_LINES + n + 1
+        w(f"\033[{footer + 2};1H💡 按 Ctrl+C 退出监控 | 自动重连: {self.reconnect_count}/{self.max_reconnect}{CLEAR_EOL}")
+        w(f"\033[{footer + 4};1H")
 
-        print("=" * 100)
-        print(f"📊 数据来源: Coinbase Pro WebSocket API | 市值排名: CoinGecko")
-        print(f"💡 按 Ctrl+C 退出监控 | 自动重连: {self.reconnect_count}/{self.max_reconnect}")
-        print("=" * 100)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
-    def _get_online_count(self):
+    def _get_online_count(self, current_time=None):
         """获取在线币种数量"""
         count = 0
-        current_time = time.time()
+        if current_time is None:
+            current_time = time.monotonic()
         for symbol in self.symbols:
             if symbol in self.price_data:
                 last_update = self.price_data[symbol].get('last_update', 0)
@@ -366,29 +454,23 @@ class CoinbaseRealtime:
         self.ws_connected = True
         self.reconnect_count = 0
         self.last_display_time = 0
+        self._rendered = {}  # 连接日志会打乱屏幕，下次显示整屏重绘
 
         print(f"\n✅ Coinbase WebSocket连接已建立")
         print(f"📡 正在订阅 {len(self.symbols)} 个交易对的ticker频道...")
 
-        # 分批订阅，避免消息过大
-        batch_size = 10
+        # 分批订阅（帧已预先序列化）
+        total_batches = len(self._subscribe_frames)
         successful_subs = 0
         
-        for i in range(0, len(self.symbols), batch_size):
-            batch = self.symbols[i:i + batch_size]
-            subscribe_data = {
-                "type": "subscribe",
-                "product_ids": batch,
-                "channels": ["ticker"]
-            }
-            
+        for n, (count, frame) in enumerate(self._subscribe_frames):
             try:
-                ws.send(json.dumps(subscribe_data))
-                print(f"✅ 已发送批次 {i//batch_size + 1}/{(len(self.symbols)-1)//batch_size + 1}")
+                ws.send(frame)
+                print(f"✅ 已发送批次 {n + 1}/{total_batches}")
                 time.sleep(0.5)  # 增加延迟避免速率限制
-                successful_subs += len(batch)
+                successful_subs += count
             except Exception as e:
-                print(f"❌ 发送批次 {i//batch_size + 1} 失败: {e}")
+                print(f"❌ 发送批次 {n + 1} 失败: {e}")
 
         print(f"✅ 订阅请求发送完成，成功发送 {successful_subs} 个交易对订阅")
         print("⏳ 等待数据推送...\n")
@@ -403,7 +485,8 @@ class CoinbaseRealtime:
                 on_error=self.on_error,
                 on_close=self.on_close
             )
-            ws.run_forever(ping_interval=20, ping_timeout=10)
+            # 交易所推送为合法 UTF-8 JSON，跳过逐帧 UTF-8 校验；on_message 收到 bytes 直接交给 loads
+            ws.run_forever(ping_interval=20, ping_timeout=10, skip_utf8_validation=True)
         except Exception as e:
             logger.error(f"❌ 启动WebSocket失败: {e}")
             if self.reconnect_count < self.max_reconnect: